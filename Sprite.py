@@ -1,12 +1,24 @@
+import time
+STARTUP_T0 = time.perf_counter()  # Taken before the Qt imports so --profile-startup can time them
 import sys
 import os
 import random
-import time 
+import argparse
+import json
+import mmap
+import tempfile
 import traceback
-from PyQt5.QtWidgets import QApplication, QLabel, QSystemTrayIcon, QMenu, QAction
-from PyQt5.QtGui import QPixmap, QTransform, QIcon
-from PyQt5.QtCore import Qt, QTimer, QRect
+from collections import Counter, OrderedDict
+from PyQt5.QtWidgets import QApplication, QLabel, QWidget, QSystemTrayIcon, QMenu, QAction
+from PyQt5.QtGui import QPixmap, QImage, QTransform, QIcon, QRegion, QMouseEvent, QCursor
+from PyQt5.QtCore import (Qt, QTimer, QRect, QPoint, QPointF, QObject, QEvent, QRunnable, QThreadPool, QLockFile,
+                          pyqtSignal)
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
 from PyQt5 import QtGui
+import spirit_assets
+import spirit_power
+from spirit_engine import (TICK_MS, ScreenLayout, SpiritModel, SpiritWorld, WorldProbe, current_rss, frame_delay,
+                           frame_rects, tick_ms_for, tick_rate)
 
 def handle_exception(exc_type, exc_value, exc_traceback):
         if issubclass(exc_type, KeyboardInterrupt):
@@ -18,554 +30,1435 @@ def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and PyInstaller """
     if hasattr(sys, '_MEIPASS'):
         return os.path.join(sys._MEIPASS, relative_path)
-    return os.path.join(os.path.abspath("."), relative_path)
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), relative_path)
 base_path = resource_path("tiny-hero-sprites")
 icon_path = resource_path("icon.ico")
 
 
 sys.excepthook = handle_exception
 
-class Spirit(QLabel):
-    def __init__(self, frame_width, frame_height, animations, start_state="walk", frame_delay=150):
-        super().__init__()
-        
-        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint | Qt.Tool)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-
-        self.frame_width = frame_width
-        self.frame_height = frame_height
-        self.animations = animations
-        self.direction = 1
-        self.current_frame = 0
-        self.frames = []
-        self.state = None
-        self.walking = True
-        self.flipped = False
-        self.previous_state = None
-        self.locked = False  # locks state switching
-        self.mouse_over = False
-        self.can_attack = True
-        # Timers
-        self.animation_timer = QTimer()
-        self.animation_timer.timeout.connect(self.update_frame)
-
-        self.move_timer = QTimer()
-        self.move_timer.timeout.connect(self.move_spirit)
-
-        self.jump_timer = QTimer()
-        self.jump_timer.timeout.connect(self.try_jump)
-        self.jump_timer.start(1000)
-
-        self.climb_check_timer = QTimer()
-        self.climb_check_timer.timeout.connect(self.try_climb_sequence)
-        self.climb_check_timer.start(3000)
-        self.click_times = []
-
-        self.drag_start_time = None
-        self.drag_start_pos = None
-
-        self.health_bar = QLabel(self)
-        self.health_bar.setVisible(True)
-        self.max_health = 5
-        self.health = self.max_health
-        self.update_health_bar()
-
-        self.heal_timer = QTimer()
-        self.heal_timer.setSingleShot(True)
-        self.heal_timer.timeout.connect(self.restore_health)
-
-
-        # Start state
-        self.set_state(start_state)
-        self.move_to_start()
-
-    def update_health_bar(self):
-        bar_height = 5
-        full_width = self.frame_width
-        health_ratio = self.health / self.max_health
-        bar_width = max(1, int(full_width * health_ratio))  # Never 0
-
-        # Create transparent pixmap
-        pixmap = QPixmap(full_width, bar_height)
-        pixmap.fill(Qt.transparent)
 
-        # Paint the health bar
-        painter = QtGui.QPainter(pixmap)
-        painter.setRenderHint(QtGui.QPainter.Antialiasing)
-        painter.setBrush(Qt.red)
-        painter.setPen(Qt.NoPen)
-        painter.drawRect(0, 0, bar_width, bar_height)
-        painter.end()
+class StartupProfiler:
+    """ Wall-clock time spent in each startup phase, printed with --profile-startup """
 
-        # Update QLabel
-        self.health_bar.setPixmap(pixmap)
-        self.health_bar.setFixedSize(full_width, bar_height)
-        self.health_bar.move(0, 2)   # Move it *above* the sprite
-        self.health_bar.raise_()
-        self.health_bar.setVisible(True)
-        self.health_bar.raise_()
+    def __init__(self, started, enabled=False):
+        self.enabled = enabled
+        self.started = started
+        self.last = started
+        self.phases = []
 
-        
-        
-    def closeEvent(self, event):
-        print("[DEBUG] Spirit closing. Timer active:", self.heal_timer.isActive())
-        super().closeEvent(event)
+    def mark(self, phase):
+        # Everything since the previous mark is billed to this phase
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
 
-    def enterEvent(self, event):
-        if self.locked or self.mouse_over or not self.can_attack or self.state == "hurt":
+    def report(self):
+        if not self.enabled:
             return
+        for phase, seconds in self.phases:
+            print(f"[PROFILE] {phase:<12} {seconds * 1000:8.1f} ms")
+        print(f"[PROFILE] {'total':<12} {(self.last - self.started) * 1000:8.1f} ms")
 
-        self.mouse_over = True
-        self.can_attack = False  # disable until reset
 
-        if self.state == "walk":
-            self.set_state("walk_attack")
-            QTimer.singleShot(700, lambda: self.resume_from_attack("walk"))
+class FirstPaint(QObject):
+    """ Calls back once, after the watched widget handles its first paint event """
 
-        elif self.state == "run":
-            self.set_state("walk_attack")
-            QTimer.singleShot(700, lambda: self.resume_from_attack("run"))
+    def __init__(self, widget, callback):
+        super().__init__(widget)
+        self.widget = widget
+        self.callback = callback
+        widget.installEventFilter(self)
 
-        else:
-            attack_state = random.choice(["attack1", "attack2"])
-            previous = self.state if self.state in ("walk", "run") else "walk"
-            self.set_state(attack_state)
-            QTimer.singleShot(700, lambda: self.resume_from_attack(previous))
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.callback is not None:
+            callback, self.callback = self.callback, None
+            self.widget.removeEventFilter(self)
+            # Let the paint finish and reach the screen before running the callback
+            QTimer.singleShot(0, callback)
+        return False
 
-    def resume_from_attack(self, next_state):
-        if self.locked or self.state in ("hurt", "death"):
-            return  # Don't change state during hurt/death
-        self.set_state(next_state)
-        QTimer.singleShot(1000, lambda: setattr(self, 'can_attack', True))
 
-    def restore_state(self):
-        if not self.locked and self.previous_state:
-            self.set_state(self.previous_state)
+class DecodeJob(QRunnable):
+    """ Decodes one PNG (or maps one raw dump) into a QImage on a pool thread """
 
-    def leaveEvent(self, event):
-        self.mouse_over = False
+    def __init__(self, atlas, character, state, path, entry=None):
+        super().__init__()
+        self.atlas = atlas
+        self.character = character
+        self.state = state  # None for a packed atlas holding every state
+        self.path = path
+        self.entry = entry
 
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            self.drag_start_time = time.time()
-            self.drag_start_pos = event.globalPos()
-            self.dragging = True
-            self.drag_offset = event.pos()
-            self.setWindowOpacity(0.7)
+    def run(self):
+        start = time.perf_counter()
+        image = self.atlas.read_raw(self.entry) if self.entry is not None else None
+        if image is None:
+            image = QImage(self.path)
+        # Queued over to the GUI thread, which owns every QPixmap
+        self.atlas.decoded.emit(self.character, self.state, self.path, image, time.perf_counter() - start)
 
-            # Stop movement and fall/climb
-            self.move_timer.stop()
-            if hasattr(self, 'climb_timer') and self.climb_timer.isActive():
-                self.climb_timer.stop()
-            if hasattr(self, 'climb_down_timer') and self.climb_down_timer.isActive():
-                self.climb_down_timer.stop()
-            if hasattr(self, 'fall_timer') and self.fall_timer.isActive():
-                self.fall_timer.stop()
 
-            self.locked = True
+class FrameAtlas(QObject):
+    """ Process-wide, reference-counted store of sliced frames, keyed by (character, state, direction, scale) """
 
+    IDLE_CHARACTERS = 2  # Characters no spirit shows (preloaded or shown before) that stay decoded
 
-    def mouseMoveEvent(self, event):
-        if getattr(self, 'dragging', False):
-            self.move(self.mapToGlobal(event.pos() - self.drag_offset))
-            self.update_health_bar()  # Update health bar position
+    decoded = pyqtSignal(str, object, str, QImage, float)
+    frames_ready = pyqtSignal(str, str)  # character, state
 
-    def mouseReleaseEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            self.dragging = False
-            self.setWindowOpacity(1.0)
-
-            end_time = time.time()
-            end_pos = event.globalPos()
-
-            time_diff = end_time - getattr(self, 'drag_start_time', 0)
-            dist = (end_pos - getattr(self, 'drag_start_pos', event.globalPos())).manhattanLength()
+    def __init__(self):
+        super().__init__()
+        self.frames = {}
+        self.characters = set()  # requested, finished or not
+        self.packed = set()  # characters that came from a packed atlas
+        self.pending = {}  # character -> states still being decoded
+        self.sizes = {}  # character -> (frame_width, frame_height, animations)
+        self.counts = {}  # character -> {state: frame count}, one dict shared by all its spirits
+        self.refs = Counter()  # (character, scale) -> spirits showing it; frames exist for each key
+        self.idle = OrderedDict()  # characters nobody shows, least recently used first
+        self.masks = {}  # frame pixmap cacheKey -> QRegion of its opaque pixels
+        self.shapes = {}  # (frame pixmap cacheKey, scale) -> input mask including the health bar
+        self.evicted = 0
+        self.timings = {}  # asset path -> (decode ms on a pool thread, convert ms on the GUI thread)
+        self.index = None
+        self.index_dir = None
+        self.load_time = 0.0
+        self.hits = 0
+        self.misses = 0
+        # Our own pool: Qt converts large images on the global one while holding the GIL,
+        # so decode jobs waiting there to emit would deadlock against QPixmap.fromImage
+        self.pool = QThreadPool(self)
+        self.decoded.connect(self.store)
+
+    def open_index(self, path):
+        # Packed atlases written by --build-atlas; without one we fall back to the PNG strips
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.index = json.load(f)
+            self.index_dir = os.path.dirname(path)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Failed to read atlas index '{path}': {e}")
+
+    def request(self, character, animations, frame_width, frame_height, first=None, priority=1):
+        # Queue the decodes and return at once; frames_ready fires per state as they land
+        if character in self.characters:
+            return
+        self.characters.add(character)
+        self.sizes[character] = (frame_width, frame_height, animations)
+        self.counts[character] = frame_counts(animations)
+        self.pending[character] = set(animations)
+        self.make_idle(character)  # Until a spirit acquires it
+        pool = self.pool
+
+        entry = self.packed_entry(character, animations)
+        if entry is not None:
+            # One decode (or one mmap) for the whole character instead of one per strip
+            self.packed.add(character)
+            path = os.path.join(self.index_dir, entry["image"])
+            pool.start(DecodeJob(self, character, None, path, entry), priority)
+            return
 
-            if time_diff < 0.3 and dist < 10:
-                # Treat as a click: apply damage
-                self.health -= 1
-                self.update_health_bar()
-                self.heal_timer.start(10000)  # 10 seconds
+        # The state the spirit starts in goes first, then idle as a stand-in, then the rest
+        order = sorted(animations, key=lambda state: (state != first, state != "idle"))
+        for state in order:
+            pool.start(DecodeJob(self, character, state, animations[state][0]), priority)
+
+    def packed_entry(self, character, animations):
+        entry = (self.index or {}).get("characters", {}).get(character)
+        if entry is None or not set(animations) <= set(entry["states"]):
+            return None
+        if not hasattr(sys, '_MEIPASS'):
+            # In a checkout, an edited strip makes its atlas stale
+            try:
+                built = os.path.getmtime(os.path.join(self.index_dir, entry["image"]))
+                if any(os.path.getmtime(path) > built for path, _ in animations.values()):
+                    return None
+            except OSError:
+                return None
+        return entry
+
+    def read_raw(self, entry):
+        # Premultiplied ARGB32 dumped by --build-atlas --raw maps straight into a QImage
+        if not entry.get("raw") or entry.get("byteorder") != sys.byteorder:
+            return None
+        try:
+            with open(os.path.join(self.index_dir, entry["raw"]), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        width, height = entry["width"], entry["height"]
+        if len(mapped) != width * height * 4:
+            mapped.close()
+            return None
+        image = QImage(mapped, width, height, width * 4, QImage.Format_ARGB32_Premultiplied)
+        # Detach from the map before closing it
+        image = image.copy()
+        mapped.close()
+        return image
+
+    def store(self, character, state, path, image, decode_seconds):
+        # GUI thread: turn a decoded image into sliced, pre-flipped pixmaps
+        if character not in self.sizes:
+            return  # Evicted while it was decoding
+        start = time.perf_counter()
+        frame_width, frame_height, animations = self.sizes[character]
+        if state is None:
+            entry = self.index["characters"][character]
+            rects = {name: entry["states"][name]["frames"] for name in animations}
+        else:
+            rects = {state: frame_rects(animations[state][1], frame_width, frame_height)}
+        if image.isNull():
+            print(f"[ERROR] Failed to load sprite '{path}': Missing sprite")
+            rects = {}
+        else:
+            pixmap = QPixmap.fromImage(image)
+            flip = QTransform().scale(-1, 1)
+            for name, boxes in rects.items():
+                frames = [pixmap.copy(QRect(*rect)) for rect in boxes]
+                self.frames[(character, name, 1, 1)] = self.with_masks(frames)
+                self.frames[(character, name, -1, 1)] = self.with_masks([frame.transformed(flip) for frame in frames])
+                for scale in self.scales_of(character) - {1}:
+                    self.scale_state(character, name, scale)
+        convert_seconds = time.perf_counter() - start
+        self.timings[path] = (decode_seconds * 1000, convert_seconds * 1000)
+        self.load_time += convert_seconds
+
+        self.pending[character] -= set(animations) if state is None else {state}
+        for name in rects:
+            self.frames_ready.emit(character, name)
+
+    def scales_of(self, character):
+        return {scale for name, scale in self.refs if name == character}
+
+    def acquire(self, character, scale=1):
+        # A spirit starts showing this character at this scale
+        self.idle.pop(character, None)
+        self.refs[(character, scale)] += 1
+        if self.refs[(character, scale)] == 1 and scale != 1:
+            # Nearest-neighbour copies of everything loaded so far, made once per scale
+            for name, state, direction, size in list(self.frames):
+                if name == character and size == 1 and direction == 1:
+                    self.scale_state(character, state, scale)
+
+    def release(self, character, scale=1):
+        # Scaled copies stay while the character is in use, so walking back and forth between
+        # screens is free. Once nobody shows it, it joins the idle characters.
+        self.refs[(character, scale)] -= 1
+        if self.refs[(character, scale)] > 0:
+            return
+        del self.refs[(character, scale)]
+        if not self.scales_of(character):
+            self.make_idle(character)
+
+    def make_idle(self, character):
+        # Idle characters keep their unscaled frames, so switching back is a lookup; past
+        # IDLE_CHARACTERS the least recently used one is evicted
+        for key in [key for key in self.frames if key[0] == character and key[3] != 1]:
+            self.drop(key)
+        self.idle[character] = None
+        self.idle.move_to_end(character)
+        while len(self.idle) > self.IDLE_CHARACTERS:
+            self.evict(next(iter(self.idle)))
+
+    def drop(self, key):
+        # Spirits still holding the frame list keep its pixmaps alive until they move on
+        for frame in self.frames.pop(key):
+            self.masks.pop(frame.cacheKey(), None)
+            self.shapes.pop((frame.cacheKey(), key[3]), None)
+        self.evicted += 1
+
+    def evict(self, character):
+        for key in [key for key in self.frames if key[0] == character]:
+            self.drop(key)
+        # Showing it again decodes it again
+        self.idle.pop(character, None)
+        self.characters.discard(character)
+        self.packed.discard(character)
+        self.pending.pop(character, None)
+        self.sizes.pop(character, None)
+        self.counts.pop(character, None)
+
+    def scale_state(self, character, state, scale):
+        for direction in (1, -1):
+            frames = self.frames[(character, state, direction, 1)]
+            self.frames[(character, state, direction, scale)] = self.with_masks([
+                frame.scaled(frame.width() * scale, frame.height() * scale,
+                             Qt.IgnoreAspectRatio, Qt.FastTransformation)
+                for frame in frames
+            ])
+
+    def with_masks(self, frames):
+        # Alpha masks are taken once here, so hit tests never sample pixels
+        for frame in frames:
+            self.masks[frame.cacheKey()] = QRegion(frame.mask())
+        return frames
+
+    def mask(self, pixmap):
+        return self.masks.get(pixmap.cacheKey())
+
+    def shape(self, pixmap, scale, extra):
+        # Opaque pixels of a frame plus the health bar, built once per frame and scale
+        key = (pixmap.cacheKey(), scale)
+        region = self.shapes.get(key)
+        if region is None:
+            region = self.mask(pixmap) or QRegion(pixmap.rect())
+            region = self.shapes[key] = region.united(extra)
+        return region
+
+    def frame_counts(self, character):
+        return self.counts[character]
+
+    def is_pending(self, character, state):
+        return state in self.pending.get(character, ())
+
+    def fallback(self, character, direction, scale=1):
+        # Whatever is ready while the wanted state is still decoding
+        for state in ("idle", "walk"):
+            frames = self.frames.get((character, state, direction, scale))
+            if frames:
+                return frames
+        for (name, state, facing, size), frames in self.frames.items():
+            if name == character and facing == direction and size == scale:
+                return frames
+        return None
+
+    def get(self, character, state, direction, scale=1):
+        frames = self.frames.get((character, state, direction, scale))
+        if frames is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return frames
+
+    def report(self):
+        decode = sum(decode for decode, _ in self.timings.values())
+        print(f"[INFO] Frame atlas: {len(self.characters)} character(s) ({len(self.packed)} packed), "
+              f"{len(self.frames)} frame sets, decoded in {decode:.1f} ms on the pool, "
+              f"converted in {self.load_time * 1000:.1f} ms, {self.hits} hits / {self.misses} misses")
+        if self.timings:
+            path, (slowest, _) = max(self.timings.items(), key=lambda item: item[1][0])
+            print(f"[INFO] Slowest asset: {os.path.basename(path)} ({slowest:.1f} ms)")
+        for character, usage in sorted(self.memory().items()):
+            scales = ", ".join(f"{spirits} at {scale}x" for scale, spirits in sorted(usage["spirits"].items()))
+            print(f"[INFO] Frames {character}: {usage['frame_sets']} frame sets, "
+                  f"{usage['pixmap_bytes'] / 1024:.0f} KB pixmaps + {usage['mask_bytes'] / 1024:.0f} KB masks, "
+                  f"shown by {scales or 'no spirits'}")
+        if self.evicted:
+            print(f"[INFO] Frames evicted: {self.evicted} frame sets nobody showed any more")
+
+    def memory(self):
+        """ Per character: frame sets held, their pixel and mask bytes, and spirits per scale """
+        usage = {}
+        for (character, _, _, _), frames in self.frames.items():
+            entry = usage.setdefault(character, {"frame_sets": 0, "pixmap_bytes": 0, "mask_bytes": 0, "spirits": {}})
+            entry["frame_sets"] += 1
+            for frame in frames:
+                entry["pixmap_bytes"] += frame.width() * frame.height() * frame.depth() // 8
+                mask = self.masks.get(frame.cacheKey())
+                if mask is not None:
+                    entry["mask_bytes"] += mask.rectCount() * 16  # One QRect per band
+        for (character, scale), spirits in self.refs.items():
+            if character in usage:
+                usage[character]["spirits"][scale] = spirits
+        return usage
+
+
+frame_atlas = FrameAtlas()
+
+
+def build_atlases(base_path, characters, animations_for, frame_size, raw=False):
+    """ Pack every character's strips into one atlas image plus an atlas.json index """
+    index = {"version": 1, "characters": {}}
+    for character in characters:
+        animations = animations_for(character)
+        frame_width, frame_height = frame_size(character)
+        width = max(frame_count for _, frame_count in animations.values()) * frame_width
+        height = len(animations) * frame_height
+        atlas = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        atlas.fill(Qt.transparent)
+
+        # One row per state, frames left to right like the source strips
+        states = {}
+        painter = QtGui.QPainter(atlas)
+        for row, (state, (sprite_path, frame_count)) in enumerate(animations.items()):
+            strip = QImage(sprite_path)
+            if strip.isNull():
+                print(f"[ERROR] Failed to load sprite '{sprite_path}': Missing sprite")
+                continue
+            y = row * frame_height
+            painter.drawImage(0, y, strip, 0, 0, frame_count * frame_width, frame_height)
+            states[state] = {
+                "frames": frame_rects(frame_count, frame_width, frame_height, y),
+                "frame_count": frame_count,
+                "frame_delay": frame_delay(state),
+            }
+        painter.end()
 
-                if self.health <= 0:
-                    self.locked = False
-                    self.trigger_death_from_clicks()
-                    return
+        image_name = f"{character}/{character}_atlas.png"
+        atlas.save(os.path.join(base_path, image_name))
+        entry = {"image": image_name, "width": width, "height": height,
+                 "frame_width": frame_width, "frame_height": frame_height, "states": states}
+        if raw:
+            raw_name = f"{character}/{character}_atlas.argb"
+            with open(os.path.join(base_path, raw_name), "wb") as f:
+                f.write(atlas.constBits().asstring(atlas.sizeInBytes()))
+            entry.update(raw=raw_name, byteorder=sys.byteorder)
+        index["characters"][character] = entry
+        print(f"[INFO] Packed {character}: {len(states)} states into {width}x{height}")
+
+    with open(os.path.join(base_path, "atlas.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+
+class ScreenIndex(ScreenLayout):
+    """ ScreenLayout kept up to date from QGuiApplication screen signals """
+
+    def __init__(self, app, scale=1):
+        super().__init__()
+        self.app = app
+        self.scale = scale  # an int, or "auto" to pick one per screen
+        app.screenAdded.connect(self.screen_added)
+        app.screenRemoved.connect(lambda screen: self.rebuild(removed=screen))
+        app.primaryScreenChanged.connect(lambda screen: self.rebuild())
+        for screen in app.screens():
+            self.watch(screen)
+        self.rebuild()
+
+    def watch(self, screen):
+        screen.geometryChanged.connect(lambda rect: self.rebuild())
+        screen.availableGeometryChanged.connect(lambda rect: self.rebuild())
+
+    def screen_added(self, screen):
+        self.watch(screen)
+        self.rebuild()
+
+    def rebuild(self, removed=None):
+        screens = [screen for screen in self.app.screens() if screen is not removed]
+        primary = self.app.primaryScreen()
+        self.update([rect_edges(screen.geometry()) for screen in screens],
+                    [rect_edges(screen.availableGeometry()) for screen in screens],
+                    screens.index(primary) if primary in screens else 0,
+                    [self.scale_for(screen) for screen in screens])
+
+    def scale_for(self, screen):
+        if self.scale != "auto":
+            return self.scale
+        # 96 dpi is 1x. Qt already scales by the device pixel ratio, so only the rest is ours;
+        # physical DPI catches 4K panels running at 100% scaling.
+        ratio = screen.devicePixelRatio()
+        dpi = max(screen.logicalDotsPerInch() * ratio, min(screen.physicalDotsPerInch(), 400))
+        return max(1, min(4, round(dpi / 96 / ratio)))
+
+
+def rect_edges(rect):
+    return rect.left(), rect.top(), rect.right(), rect.bottom()
+
+
+class WorldClock:
+    """ Drives a SpiritWorld from a single Qt timer at its fixed tick rate """
+
+    def __init__(self, world):
+        self.world = world
+        self.started_at = None
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        world.clock = self.elapsed
+
+    def elapsed(self):
+        if self.started_at is None:
+            return self.world.now
+        return int((time.monotonic() - self.started_at) * 1000)
+
+    def start(self):
+        self.started_at = time.monotonic() - self.world.now / 1000
+        self.timer.start(self.world.tick_ms)
+
+    def stop(self):
+        self.timer.stop()
+        self.started_at = None
+
+    def tick(self):
+        self.world.advance(self.elapsed())
+
+    def set_tick_rate(self, rate):
+        # Motion is time-based, so only the smoothness changes, not the speed
+        self.world.tick_ms = tick_ms_for(rate)
+        if self.timer.isActive():
+            self.timer.setInterval(self.world.tick_ms)
+
+
+class PowerPolicy:
+    """ Picks a power tier from session state and idle time and applies it to the world clock """
+
+    POLL_MS = 5000
+    DOZE_MS = 250  # Idle animation rate while REDUCED
+    WAKE_S = 60  # Mouse input on a spirit keeps it at full rate this long
+
+    def __init__(self, world_clock, spirits, forced=None):
+        self.clock = world_clock
+        self.spirits = spirits  # The live list, so spawned and removed spirits are picked up
+        self.forced = forced
+        self.tier = spirit_power.FULL
+        self.since = time.monotonic()
+        self.durations = dict.fromkeys(spirit_power.TIERS, 0.0)
+        self.awake_until = 0.0
+        self.cursor = QCursor.pos()
+        self.cursor_moved = time.monotonic()
+        self.doze_step = 0
+        world_clock.world.on_input = self.nudge
+
+        self.poll_timer = QTimer()
+        self.poll_timer.timeout.connect(self.evaluate)
+        self.poll_timer.start(self.POLL_MS)
+        self.doze_timer = QTimer()
+        self.doze_timer.timeout.connect(self.doze)
+
+    def idle_seconds(self):
+        # The platform's own idle time if it has one, otherwise time since the cursor last moved
+        idle = spirit_power.idle_seconds()
+        if idle is not None:
+            return idle
+        cursor = QCursor.pos()
+        if cursor != self.cursor:
+            self.cursor = cursor
+            self.cursor_moved = time.monotonic()
+        return time.monotonic() - self.cursor_moved
+
+    def evaluate(self):
+        if time.monotonic() < self.awake_until:
+            self.apply(spirit_power.FULL)
+        elif self.forced is not None:
+            self.apply(self.forced)
+        else:
+            session = spirit_power.probe_session()
+            session["idle"] = self.idle_seconds()
+            self.apply(spirit_power.choose_tier(**session))
+
+    def force(self, tier):
+        # None goes back to picking the tier automatically
+        self.forced = tier
+        self.awake_until = 0.0
+        self.evaluate()
+
+    def nudge(self):
+        # Even a pinned tier wakes up while someone plays with a spirit
+        self.awake_until = time.monotonic() + self.WAKE_S
+        self.apply(spirit_power.FULL)
+
+    def apply(self, tier):
+        if tier == self.tier:
+            return
+        now = time.monotonic()
+        self.durations[self.tier] += now - self.since
+        self.since = now
+        print(f"[INFO] Power: {self.tier} -> {tier}")
+        self.tier = tier
+        if tier == spirit_power.FULL:
+            # The frozen clock resumes where it stopped, so every timer and motion carries on
+            self.doze_timer.stop()
+            for spirit in self.spirits:
+                spirit.wake()
+            self.clock.start()
+            return
+        self.clock.stop()
+        if tier == spirit_power.REDUCED:
+            self.doze_step = 0
+            self.doze_timer.start(self.DOZE_MS)
+        else:
+            self.doze_timer.stop()
+
+    def doze(self):
+        self.doze_step += 1
+        for spirit in self.spirits:
+            spirit.doze(self.doze_step)
+
+    def report(self):
+        self.durations[self.tier] += time.monotonic() - self.since
+        self.since = time.monotonic()
+        spent = ", ".join(f"{tier} {seconds:.0f} s" for tier, seconds in self.durations.items())
+        print(f"[INFO] Power: {spent}")
+
+
+class HealthBar(QLabel):
+    """ Health bar child label that swaps between prebuilt pixmaps, one per health level """
+
+    _pixmaps = {}  # (width, height, max_health) -> [QPixmap for health 0..max_health]
+    repaints = 0
+    repaints_avoided = 0
+
+    def __init__(self, parent, width, max_health, height=5):
+        super().__init__(parent)
+        self.max_health = max_health
+        self.health = None
+        self.base_width = width
+        self.base_height = height
+        self.set_scale(1)
+        self.raise_()
+        self.setVisible(True)
+
+    def set_scale(self, scale):
+        # Geometry only changes with the sprite's scale factor
+        width, height = self.base_width * scale, self.base_height * scale
+        self.pixmaps = self.prebuilt(width, height, self.max_health)
+        self.setFixedSize(width, height)
+        self.move(0, 2 * scale)   # Move it *above* the sprite
+        if self.health is not None:
+            self.setPixmap(self.pixmaps[self.health])
+
+    @classmethod
+    def prebuilt(cls, width, height, max_health):
+        key = (width, height, max_health)
+        if key not in cls._pixmaps:
+            cls._pixmaps[key] = [cls.paint(width, height, health / max_health)
+                                 for health in range(max_health + 1)]
+        return cls._pixmaps[key]
+
+    @staticmethod
+    def paint(width, height, health_ratio):
+        bar_width = max(1, int(width * health_ratio))  # Never 0
 
-                if  self.state not in ("hurt", "death"):
-                    self.locked = False
-                    saved_previous = self.state if self.state in ("walk", "run") else "walk"
-                    self.set_state("hurt")
-                    QTimer.singleShot(700, lambda: self.restore_after_hurt(saved_previous))
+        # Create transparent pixmap
+        pixmap = QPixmap(width, height)
+        pixmap.fill(Qt.transparent)
 
-            else:
-                self.set_state("idle")
-                self.start_falling()
+        # Paint the health bar
+        painter = QtGui.QPainter(pixmap)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setBrush(Qt.red)
+        painter.setPen(Qt.NoPen)
+        painter.drawRect(0, 0, bar_width, height)
+        painter.end()
+        return pixmap
 
-    def restore_health(self):
-        
-        
-        if self.health < self.max_health:
-            self.health = self.max_health
-            self.update_health_bar()
-            self.set_state("idle")  # or custom "heal" state
-            QTimer.singleShot(500, lambda: self.set_state("walk"))
-            
-
-    def restore_after_hurt(self, previous):
-        
-        self.locked = False  # Always unlock!
-        if self.state == "hurt":
-            self.set_state(previous)
+    def set_health(self, health):
+        health = max(0, min(health, self.max_health))
+        if health == self.health:
+            HealthBar.repaints_avoided += 1
+            return
+        self.health = health
+        self.setPixmap(self.pixmaps[health])
+        HealthBar.repaints += 1
 
-    def trigger_death_from_clicks(self):
-        if self.locked:
-            return  # Already dying
+    @classmethod
+    def report(cls):
+        print(f"[INFO] Health bar: {cls.repaints} repaints, {cls.repaints_avoided} avoided")
 
-        self.locked = True
 
-        # Clear any other queued QTimers by reinitializing (soft way)
-        self.animation_timer.stop()
-        self.move_timer.stop()
-        self.jump_timer.stop()
-        self.climb_check_timer.stop()
+class SpiritOverlay(QWidget):
+    """ Translucent window covering one screen; only the spirits' rects take input """
 
-        self.set_state("death")
-        QTimer.singleShot(2000, self.reset_spirit)
+    def __init__(self, compositor, geometry):
+        super().__init__()
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setGeometry(geometry)
+        self.compositor = compositor
+        self.grabbed = None
+
+    def paintEvent(self, event):
+        # The translucent backing store is cleared for us, so just draw whatever intersects
+        painter = QtGui.QPainter(self)
+        origin = self.pos()
+        dirty = event.rect()
+        for spirit in self.compositor.spirits:
+            rect = spirit.geometry().translated(-origin)
+            if spirit.pixmap() is None or not rect.intersects(dirty):
+                continue  # No frame yet while its character is still decoding
+            painter.setOpacity(spirit.windowOpacity())
+            painter.drawPixmap(rect.topLeft(), spirit.pixmap())
+            bar = spirit.health_bar
+            painter.drawPixmap(rect.topLeft() + bar.pos(), bar.pixmap())
+        painter.end()
 
+    def spirit_at(self, global_pos):
+        # Topmost (last painted) spirit first; only opaque pixels count
+        for spirit in reversed(self.compositor.spirits):
+            if spirit.geometry().contains(global_pos) and spirit.shape().contains(global_pos - spirit.pos()):
+                return spirit
+        return None
 
-    def try_climb_sequence(self):
-        if self.locked:
-            return
-        if self.state not in ("walk", "run", "idle", "hurt"):
-            return
-        screen = self.screen_rect()
-        at_left_edge = self.x() <= 0
-        at_right_edge = self.x() + self.frame_width >= screen.width()
-
-        if at_left_edge or at_right_edge:
-            if random.random() < 1.0:  # 100% chance at edge
-                self.set_state("climb")
-                self.start_climbing()
-
-    def start_climbing(self):
-        self.locked = True
-        self.move_timer.stop()
-        self.jump_timer.stop()
-        self.climb_check_timer.stop()
-        
-        self.climb_timer = QTimer()
-        self.climb_timer.timeout.connect(self.climb_step)
-        self.climb_timer.start(50)
+    def forward(self, event, spirit):
+        # Re-express the event in the spirit's own coordinates
+        local = event.globalPos() - spirit.pos()
+        return QMouseEvent(event.type(), QPointF(local), QPointF(event.globalPos()),
+                           event.button(), event.buttons(), event.modifiers())
 
-    def climb_step(self):
-        x = 0 if self.direction == -1 else self.screen_rect().width() - self.frame_width
-        y = self.y() - 5
+    def mouseMoveEvent(self, event):
+        if self.grabbed is not None:
+            self.grabbed.mouseMoveEvent(self.forward(event, self.grabbed))
 
-        if y <= 0:
-            self.climb_timer.stop()
+    def enterEvent(self, event):
+        # As with Spirit.enterEvent: the world's cursor poll does the rest
+        spirit = self.spirit_at(QCursor.pos())
+        if spirit is not None:
+            spirit.model.world.input()
 
-            if random.random() < 0.5:
-                self.set_state("idle")
-                self.start_falling()
-            else:
-                self.set_state("climb")
-                self.start_climbing_down()
-        else:
-            self.move(x, y)
-            self.update_health_bar()
-
-    def start_climbing_down(self):
-        self.climb_down_timer = QTimer()
-        self.climb_down_timer.timeout.connect(self.climb_down_step)
-        self.climb_down_timer.start(50)
-
-    def climb_down_step(self):
-        x = 0 if self.direction == -1 else self.screen_rect().width() - self.frame_width
-        y = self.y() + 5
-        screen = self.screen_rect()
-
-        if y >= screen.height() - self.frame_height - 50:
-            self.climb_down_timer.stop()
-            self.unlock_and_resume()
-        else:
-            self.move(x, y)
-            self.update_health_bar()
-
-    def start_falling(self):
-        self.fall_start_y = self.y()  # record where fall started
-        self.fall_timer = QTimer()
-        self.fall_timer.timeout.connect(self.fall_step)
-        self.fall_timer.start(50)
-
-    def fall_step(self):
-        screen = self.screen_rect()
-        y = self.y() + 6
-        x = self.x()
-        self.move(x, y)
-        self.update_health_bar()
-
-        fall_distance = y - self.fall_start_y
-        half_screen = screen.height() // 2
-        bottom = screen.bottom() - self.frame_height - 50
-
-        if y >= bottom:
-            self.fall_timer.stop()
-
-            if fall_distance > half_screen:
-                self.set_state("death")
-                QTimer.singleShot(1200, self.reset_spirit)
-            else:
-                if self.health > 0:
-                    self.health -= 1
-                    self.health = max(0, self.health)  # Clamp to 0
-                    self.update_health_bar()
-                    self.heal_timer.start(10000)
-                    
-
-                    if self.health == 0:
-                        self.locked = False
-                        self.trigger_death_from_clicks()
-                        return
-                    self.locked = False
-                    self.set_state("hurt")
-                    QTimer.singleShot(700, self.unlock_and_resume)
-
-
-
-
-    def reset_spirit(self):
-        self.locked = False
-        self.health = self.max_health
-        self.update_health_bar()
-
-        screen = self.screen_rect()
-        self.direction = random.choice([-1, 1])
-        x = screen.left() if self.direction == 1 else screen.right() - self.frame_width
-        y = screen.bottom() - self.frame_height - 50
-        self.move(x, y)
-        try:
-            self.set_state("walk")
-        except Exception as e:
-            print(f"[ERROR] Failed to reset state: {e}")
-            self.set_state("idle")
-        self.update_health_bar()
-
-    def unlock_and_resume(self):
-        self.locked = False
-        self.jump_timer.start(1000)
-        self.climb_check_timer.start(3000)
-        self.set_state("walk")
-
-    def move_to_start(self):
-        screen = self.screen_rect()
-        self.move(0, screen.height() - self.frame_height - 50)
-        self.update_health_bar() 
-
-    def screen_rect(self):
-        pos = self.frameGeometry().center()
-        screen = QApplication.screenAt(pos)
-        if screen:
-            return screen.availableGeometry()
-        return QApplication.primaryScreen().availableGeometry()
-
-    def safe_set_state(self, state):
-        try:
-            self.set_state(state)
-        except Exception as e:
-            print(f"[ERROR] Failed to set state: {e}")
-            QTimer.singleShot(700, lambda: self.safe_set_state("walk"))
-
-    def set_state(self, new_state):
-        if new_state not in self.animations:
-            print(f"[ERROR] Animation state '{new_state}' not found.")
+    def mousePressEvent(self, event):
+        spirit = self.spirit_at(event.globalPos())
+        if spirit is None:
             return
+        self.grabbed = spirit
+        spirit.mousePressEvent(self.forward(event, spirit))
+        self.compositor.mark_dirty(spirit)
 
-        if self.locked and new_state != "death":
-            return  # Prevent interruptions during death/climb
-        
-        if new_state not in self.animations:
-            print(f"State {new_state} not found!")
+    def mouseReleaseEvent(self, event):
+        spirit, self.grabbed = self.grabbed, None
+        if spirit is None or spirit not in self.compositor.spirits:
             return
+        spirit.mouseReleaseEvent(self.forward(event, spirit))
+        self.compositor.mark_dirty(spirit)
+
+
+class OverlayCompositor:
+    """ Rendering backend that paints every spirit into one overlay per screen """
+
+    def __init__(self, screens):
+        self.screens = screens
+        self.spirits = []
+        self.overlays = []
+        self.painted = {}  # spirit -> global rect it was last painted at
+        self.shapes = {}  # spirit -> cacheKey of the frame it was last painted with
+        self.dirty = set()
+        self.flush_pending = False
+        self.repaints = 0
+        screens.listeners.append(self.rebuild)
+        self.rebuild()
+
+    def rebuild(self):
+        for overlay in self.overlays:
+            overlay.close()
+            overlay.deleteLater()
+        self.overlays = [SpiritOverlay(self, QRect(QPoint(left, top), QPoint(right, bottom)))
+                         for left, top, right, bottom in self.screens.edges]
+        self.painted.clear()
+        self.shapes.clear()
+        for spirit in self.spirits:
+            self.mark_dirty(spirit)
+
+    def add(self, spirit):
+        self.spirits.append(spirit)
+        spirit.overlay = self
+        self.mark_dirty(spirit)
+
+    def remove(self, spirit):
+        self.spirits.remove(spirit)
+        self.dirty.discard(spirit)
+        spirit.overlay = None
+        for overlay in self.overlays:
+            if overlay.grabbed is spirit:
+                overlay.grabbed = None
+        self.shapes.pop(spirit, None)
+        rect = self.painted.pop(spirit, None)
+        if rect is not None:
+            self.invalidate(rect)
+            self.update_masks()
+
+    def mark_dirty(self, spirit):
+        self.dirty.add(spirit)
+        if not self.flush_pending:
+            # Coalesce every change made during this pass of the event loop
+            self.flush_pending = True
+            QTimer.singleShot(0, self.flush)
+
+    def flush(self):
+        self.flush_pending = False
+        reshaped = False
+        for spirit in self.dirty:
+            rect = spirit.geometry()
+            old = self.painted.get(spirit)
+            if old is not None and old != rect:
+                self.invalidate(old)
+                reshaped = True
+            elif old is None:
+                reshaped = True
+            self.painted[spirit] = rect
+            self.invalidate(rect)
+            # A new frame has a new outline, and the input mask follows it
+            shape = spirit.pixmap().cacheKey() if spirit.pixmap() is not None else None
+            if self.shapes.get(spirit) != shape:
+                self.shapes[spirit] = shape
+                reshaped = True
+        self.dirty.clear()
+        if reshaped:
+            self.update_masks()
+
+    def invalidate(self, rect):
+        for overlay in self.overlays:
+            geometry = overlay.geometry()
+            if geometry.intersects(rect):
+                overlay.update(rect.translated(-geometry.topLeft()))
+                self.repaints += 1
+
+    def update_masks(self):
+        # Input only reaches the overlay where a spirit is drawn; everything else clicks through
+        for overlay in self.overlays:
+            geometry = overlay.geometry()
+            region = QRegion()
+            for spirit, rect in self.painted.items():
+                if geometry.intersects(rect):
+                    region = region.united(spirit.shape().translated(rect.topLeft() - geometry.topLeft()))
+            if region.isEmpty():
+                overlay.hide()  # An empty mask would mean "no mask"
+            else:
+                overlay.setMask(region)
+                if not overlay.isVisible():
+                    overlay.show()
 
-        if self.state == "jump":
-            self.previous_state = self.previous_state or "walk"
-        elif self.state != "jump":
-            self.previous_state = self.state
+    def report(self):
+        print(f"[INFO] Overlay: {len(self.overlays)} overlay(s), {len(self.spirits)} spirit(s), "
+              f"{self.repaints} dirty-rect updates")
 
-        self.state = new_state
-        sprite_path, frame_count = self.animations[new_state]
 
+class StatsOverlay(QLabel):
+    """ Small always-on-top readout of the latest WorldProbe snapshot """
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint | Qt.Tool)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 180); color: white; padding: 4px;")
+        self.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        self.setText("Waiting for stats...")
+
+    def show_snapshot(self, snapshot):
+        if not self.isVisible():
+            return
+        rss = snapshot["rss_mb"]
+        jitter = snapshot["tick_jitter_ms"]
+        lines = [
+            f"spirits {snapshot['spirits']}  cpu {snapshot['cpu_percent']:.1f}%  "
+            f"rss {f'{rss:.1f} MB' if rss is not None else 'n/a'}",
+            f"ticks {snapshot['ticks']}  jitter {jitter['mean']:.1f} / {jitter['max']:.1f} ms",
+        ]
+        for name, timing in sorted(snapshot["timings_us"].items()):
+            lines.append(f"{name:<18} {timing['n']:>5}x {timing['mean']:>8.1f} {timing['max']:>8.1f} us")
+        for interval, late in snapshot["timer_lateness_ms"].items():
+            lines.append(f"late @{interval + ' ms':<12} {late['n']:>5}x {late['mean']:>8.1f} {late['max']:>8.1f} ms")
+        transitions = snapshot["transitions"]
+        if transitions:
+            lines.append("  ".join(f"{state} {count}" for state, count in sorted(transitions.items())))
+        self.setText("\n".join(lines))
+        self.adjustSize()
+
+
+def control_server_name():
+    # One resident instance per user: a Unix socket in the temp dir, or a named pipe on Windows
+    user = os.environ.get("USERNAME") or os.environ.get("USER") or str(os.getuid())
+    return f"desktop-spirit-{user}"
+
+
+def forward(argv, timeout_ms=500):
+    """ Hand argv to the instance that is already running; None if there isn't one """
+    socket = QLocalSocket()
+    socket.connectToServer(control_server_name())
+    if not socket.waitForConnected(timeout_ms):
+        return None
+    socket.write((json.dumps({"argv": argv}) + "\n").encode("utf-8"))
+    socket.waitForBytesWritten(timeout_ms)
+    data = b""
+    while not data.endswith(b"\n") and socket.waitForReadyRead(5000):
+        data += bytes(socket.readAll())
+    socket.disconnectFromServer()
+    try:
+        return json.loads(data)
+    except ValueError:
+        return {"ok": False, "message": "No reply from the running instance"}
+
+
+class ControlServer(QObject):
+    """ Local socket that later launches and CLI commands talk to, one JSON line each way """
+
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler  # argv list -> reply dict
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self.accept)
+        self.commands = 0
+
+    def listen(self):
+        """ Claim the control socket; False if another instance already answers on it """
+        name = control_server_name()
+        # With UserAccessOption Qt renames its socket over whatever is at the name, so two launches
+        # at the same moment would both "win". The lock makes look-then-listen one step.
+        lock = QLockFile(os.path.join(tempfile.gettempdir(), f"{name}.lock"))
+        if not lock.tryLock(5000):
+            print("[ERROR] Timed out waiting for the control socket lock")
         try:
-            pixmap = QPixmap(sprite_path)
-            if pixmap.isNull():
-                raise FileNotFoundError(f"Missing sprite: {sprite_path}")
-        except Exception as e:
-            print(f"[ERROR] Failed to load sprite '{sprite_path}': {e}")
+            probe = QLocalSocket()
+            probe.connectToServer(name)
+            if probe.waitForConnected(500):
+                probe.disconnectFromServer()
+                return False
+            # Nobody answers, so a socket file there was left behind by a crashed instance
+            QLocalServer.removeServer(name)
+            if not self.server.listen(name):
+                print(f"[ERROR] Control socket unavailable: {self.server.errorString()}")
+            return True
+        finally:
+            lock.unlock()
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self.read(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def read(self, socket):
+        if not socket.canReadLine():
             return
+        line = bytes(socket.readLine())
+        try:
+            argv = list(json.loads(line)["argv"])
+        except (ValueError, KeyError, TypeError) as e:
+            reply = {"ok": False, "message": f"Bad request: {e}"}
+        else:
+            # Whatever goes wrong, the client gets a reply instead of waiting out its timeout
+            try:
+                reply = self.handler(argv)
+            except SystemExit:
+                reply = {"ok": False, "message": f"Bad arguments: {' '.join(argv)}"}  # From argparse
+            except Exception as e:
+                reply = {"ok": False, "message": f"{type(e).__name__}: {e}"}
+        self.commands += 1
+        socket.write((json.dumps(reply) + "\n").encode("utf-8"))
+        socket.disconnectFromServer()
 
-        self.frames = [
-            pixmap.copy(QRect(i * self.frame_width, 0, self.frame_width, self.frame_height))
-            for i in range(frame_count)
-        ]
+    def report(self):
+        print(f"[INFO] Control: {self.commands} command(s)")
 
-        if self.direction == -1:
-            self.frames = [frame.transformed(QTransform().scale(-1, 1)) for frame in self.frames]
 
-        self.current_frame = 0
-        self.setPixmap(self.frames[0])
-        self.resize(self.frame_width, self.frame_height)
+def cursor_position():
+    pos = QCursor.pos()
+    return pos.x(), pos.y()
 
-        # Slow down death animation
-        if new_state == "death":
-            self.animation_timer.start(300)  # slower frame rate
-        else:
-            self.animation_timer.start(150)  # default speed
 
-        if new_state in ("walk", "run"):
-            self.move_timer.start(50)
-        else:
-            self.move_timer.stop()
+def frame_counts(animations):
+    return {state: frame_count for state, (_, frame_count) in animations.items()}
 
 
-    def update_frame(self):
-        self.current_frame = (self.current_frame + 1) % len(self.frames)
-        self.setPixmap(self.frames[self.current_frame])
+class Spirit(QLabel):
+    """ Qt view of a SpiritModel: shows its frames and feeds it mouse input """
 
-    def move_spirit(self):
-        screen = self.screen_rect()
-        x = self.x() + self.direction * (3 if self.state == "walk" else 6)
-        y = screen.bottom() - self.frame_height - 50
-        self.move(x, y)
-        self.update_health_bar()
+    def __init__(self, frame_width, frame_height, animations, start_state="walk", frame_delay=150,
+                 character="default", *, world):
+        super().__init__()
         
-        if self.state in ("walk", "run"):
-            mid_screen = (screen.left() + screen.right()) // 2
-            if mid_screen - 10 < self.x() < mid_screen + 10 and random.random() < 0.05:
-                self.set_state("jump")
-                QTimer.singleShot(700, lambda: self.set_state(self.previous_state))
-                return
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TranslucentBackground)
 
-        if (self.direction == 1 and x + self.frame_width >= screen.right()) or \
-        (self.direction == -1 and x <= screen.left()):
-            self.pause_and_flip()
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.animations = animations
+        self.character = character
+        frame_atlas.request(character, animations, frame_width, frame_height, first=start_state)
+        frame_atlas.acquire(character)
+        frame_atlas.frames_ready.connect(self.frames_ready)
+        self.frames = []
+        self.overlay = None  # Set when an OverlayCompositor draws this spirit instead of its own window
+        self.drag_offset = QPoint()
+        self.scale = 1  # Follows the scale factor of the screen the model is on
+        self.resize(frame_width, frame_height)
+
+        self.model = SpiritModel(world, frame_width, frame_height, frame_atlas.frame_counts(character), view=self)
+
+        self.health_bar = HealthBar(self, frame_width, self.model.max_health)
 
-    def pause_and_flip(self):
-        if self.locked:
+        # Start state
+        self.model.start(start_state)
+
+    @property
+    def state(self):
+        return self.model.state
+
+    def set_character(self, character, animations, frame_width=None, frame_height=None):
+        # Swap the artwork in place; the model keeps its position, direction, state and health.
+        # Until the new character's frames are decoded the old ones stay up.
+        self.frame_width = frame_width or self.frame_width
+        self.frame_height = frame_height or self.frame_height
+        frame_atlas.request(character, animations, self.frame_width, self.frame_height, first=self.model.state)
+        frame_atlas.acquire(character, self.scale)
+        frame_atlas.release(self.character, self.scale)
+        self.character = character
+        # The bar spans the frame; set_frames resizes it (and the input shape) along with the model
+        self.health_bar.base_width = self.frame_width
+        self.model.set_frames(frame_atlas.frame_counts(character), self.frame_width, self.frame_height)
+        self.animations = animations
+        frames = frame_atlas.get(character, self.model.state, self.model.direction, self.scale)
+        if frames:
+            self.frames = frames
+            self.show_frame(frames[self.model.current_frame % len(frames)])
+
+    def frames_ready(self, character, state):
+        # A background decode landed: take it if it's what we're waiting for
+        if character != self.character or (self.frames and state != self.model.state):
             return
-        self.move_timer.stop()
-        if self.state == "walk":
-            self.set_state("idle")
-            QTimer.singleShot(1000, lambda: self.flip_and_continue("run"))
-        elif self.state == "run":
-            self.health -= 1
-            self.update_health_bar()
-            self.heal_timer.start(10000)  # 10 seconds
-            if self.health <= 0:
-                self.locked = False
-                self.trigger_death_from_clicks()
+        frames = frame_atlas.get(character, self.model.state, self.model.direction, self.scale)
+        if frames is None and not self.frames:
+            frames = frame_atlas.fallback(character, self.model.direction, self.scale)
+        if frames:
+            self.frames = frames
+            self.show_frame(frames[self.model.current_frame % len(frames)])
+
+    # === View callbacks from the model ===
+
+    def state_changed(self, state, direction):
+        # Frames are pre-sliced and pre-flipped by the atlas, so this is just a lookup
+        frames = frame_atlas.get(self.character, state, direction, self.scale)
+        if not frames and frame_atlas.is_pending(self.character, state):
+            # Still decoding: animate whatever is ready until frames_ready swaps it in
+            frames = frame_atlas.fallback(self.character, direction, self.scale)
+            if not frames:
+                self.frames = []
                 return
-            self.set_state("hurt")
-            QTimer.singleShot(1000, lambda: self.flip_and_continue("walk"))
+        if not frames:
+            print(f"[ERROR] Failed to load sprite '{self.animations[state][0]}'")
+            return
+        self.frames = frames
+        self.show_frame(self.frames[0])
+        self.resize(self.model.frame_width, self.model.frame_height)
+
+    def frame_changed(self, index):
+        if self.frames:
+            self.show_frame(self.frames[index % len(self.frames)])
+
+    def moved(self, x, y):
+        self.move(x, y)  # The health bar is a child and moves along
+
+    def scale_changed(self, scale):
+        # Prescaled frames for this scale are made once and shared by every spirit
+        if scale != self.scale:
+            frame_atlas.acquire(self.character, scale)
+            frame_atlas.release(self.character, self.scale)
+            self.scale = scale
+        self.resize(self.model.frame_width, self.model.frame_height)
+        self.health_bar.set_scale(scale)
+        self.wake()
+
+    def health_changed(self, health):
+        self.health_bar.set_health(health)
+        if self.overlay is not None:
+            self.overlay.mark_dirty(self)
+
+    def drag_changed(self, dragging):
+        self.setWindowOpacity(0.7 if dragging else 1.0)
+
+    def doze(self, step):
+        # Reduced power: idle in place on the view only, so the model resumes untouched
+        if self.model.dragging or self.model.state not in ("walk", "run", "idle"):
+            return
+        frames = frame_atlas.get(self.character, "idle", self.model.direction, self.scale)
+        if frames:
+            self.show_frame(frames[step % len(frames)])
+
+    def wake(self):
+        self.state_changed(self.model.state, self.model.direction)
+        self.frame_changed(self.model.current_frame)
+
+    def show_frame(self, pixmap):
+        self.setPixmap(pixmap)
+        if self.overlay is not None:
+            self.overlay.mark_dirty(self)
+        else:
+            # Hover and clicks only land on opaque pixels; the rest goes to the window underneath
+            self.setMask(self.shape())
+
+    def shape(self):
+        # Opaque pixels of the current frame plus the health bar, built once per frame and scale
+        pixmap = self.pixmap()
+        if pixmap is None or pixmap.isNull():
+            return QRegion(self.rect())
+        return frame_atlas.shape(pixmap, self.scale, self.health_bar.geometry())
+
+    def move(self, *args):
+        super().move(*args)
+        if self.overlay is not None:
+            self.overlay.mark_dirty(self)
+
+    # === Qt events, forwarded to the model ===
+
+    def dispose(self):
+        # Leave the world and hand back this spirit's claim on the shared frames. A decode landing
+        # before deleteLater runs must not reach frames_ready, whose model slot is gone.
+        frame_atlas.frames_ready.disconnect(self.frames_ready)
+        self.model.world.unregister(self.model)
+        frame_atlas.release(self.character, self.scale)
+        self.frames = []
+        self.close()
+        self.deleteLater()
 
-    def flip_and_continue(self, next_state):
-        if self.locked:
-            return  # Prevent mid-climb flip
-        self.direction *= -1
-        self.set_state(next_state)
+    def enterEvent(self, event):
+        # Hover attacks come from the world's cursor poll; this only wakes a dozing clock
+        self.model.world.input()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_offset = event.pos()
+            self.model.press(event.globalPos().x(), event.globalPos().y())
+
+    def mouseMoveEvent(self, event):
+        if self.model.dragging:
+            pos = self.mapToGlobal(event.pos() - self.drag_offset)
+            self.model.drag_to(pos.x(), pos.y())
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.model.release(event.globalPos().x(), event.globalPos().y())
 
-    def try_jump(self):
-        if self.locked:
-            return
-        if self.state in ("walk", "run") and random.random() < 0.05:  # 5% chance
-            self.previous_state = self.state
-            self.set_state("jump")
-            QTimer.singleShot(700, lambda: self.set_state(self.previous_state))
-    
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    # === Command line ===
+    parser = argparse.ArgumentParser(description="Desktop Spirit")
+    parser.add_argument("--count", type=int, default=int(os.environ.get("SPIRIT_COUNT", 1)),
+                        help="number of spirits to spawn across all screens")
+    parser.add_argument("--backend", choices=("window", "overlay"),
+                        default=os.environ.get("SPIRIT_BACKEND", "window"),
+                        help="one window per spirit, or one shared overlay per screen")
+    parser.add_argument("--build-atlas", action="store_true",
+                        help="pack every character into one atlas image plus atlas.json, then exit")
+    parser.add_argument("--raw", action="store_true",
+                        help="with --build-atlas, also write memory-mappable premultiplied ARGB files")
+    parser.add_argument("--profile-startup", action="store_true",
+                        default=bool(os.environ.get("SPIRIT_PROFILE_STARTUP")),
+                        help="print how long imports, Qt setup, asset loading, first paint and tray setup took")
+    parser.add_argument("--stats", nargs="?", metavar="PATH", default=os.environ.get("SPIRIT_STATS"),
+                        const=os.path.join(tempfile.gettempdir(), "spirit-stats.jsonl"),
+                        help="record tick timings, timer jitter, CPU and memory as JSON lines (default file in the temp dir)")
+    parser.add_argument("--power", choices=("auto",) + spirit_power.TIERS,
+                        default=os.environ.get("SPIRIT_POWER", "auto"),
+                        help="pick the power tier from lock/fullscreen/battery/idle state, or pin one")
+    parser.add_argument("--tick-rate", type=tick_rate, default=os.environ.get("SPIRIT_TICK_RATE", 1000 / TICK_MS),
+                        help="world ticks per second; spirits move at the same speed at any rate")
+    parser.add_argument("--scale", default=os.environ.get("SPIRIT_SCALE", "1"),
+                        type=lambda value: value if value == "auto" else max(1, int(value)),
+                        help="integer sprite scale factor, or auto to pick one per screen from its DPI")
+    parser.add_argument("--record", metavar="PATH", default=os.environ.get("SPIRIT_RECORD"),
+                        help="record the RNG seed, ticks and mouse input to a binary trace for spirit_trace.py replay")
+    parser.add_argument("command", nargs="*",
+                        help="for the running instance: spawn [N], remove [N], count N, character NAME, "
+                             "tick-rate HZ, power TIER, stats or quit")
+    control_commands = ("spawn", "remove", "count", "character", "tick-rate", "power", "stats", "quit")
+    args, _ = parser.parse_known_args(sys.argv[1:])
+    startup = StartupProfiler(STARTUP_T0, enabled=args.profile_startup)
+    startup.mark("imports")
+
+    # === Single instance: a second launch just passes its arguments on ===
+    def hand_over(reply):
+        # Print what the running instance answered and exit with its status
+        if "stats" in reply:
+            print(json.dumps(reply["stats"], indent=2))
+        print(f"[{'INFO' if reply['ok'] else 'ERROR'}] {reply['message']}")
+        sys.exit(0 if reply["ok"] else 1)
+
+    is_command = bool(args.command) and args.command[0] in control_commands
+    if not args.build_atlas:
+        reply = forward(sys.argv[1:])
+        if reply is not None:
+            hand_over(reply)
+        if is_command:
+            print("[ERROR] Desktop Spirit isn't running; start it without a command first")
+            sys.exit(1)
+
+    # === Sprite manifest (base_path comes from resource_path above) ===
+    manifest = spirit_assets.load_manifest(base_path)
+    startup.mark("manifest")
+    monster_list = sorted(manifest["characters"])
+    if not monster_list:
+        print(f"[ERROR] No usable sprites found in '{base_path}'")
+        sys.exit(1)
 
     # === Monster selection ===
-    monster_list = ["Pink_Monster", "Owlet_Monster", "Dude_Monster"]
     selected_monster = os.environ.get("SPIRIT_CHARACTER", "RANDOM")
+    if selected_monster != "RANDOM" and selected_monster not in monster_list:
+        print(f"[ERROR] Unknown character '{selected_monster}', picking one at random")
+        selected_monster = "RANDOM"
     monster = random.choice(monster_list) if selected_monster == "RANDOM" else selected_monster
-    print(f"[INFO] Loaded spirit: {monster}")
 
-    # === Asset path setup ===
-    base_path = os.path.join(os.path.dirname(__file__), "tiny-hero-sprites")
+    # === Animations dictionary ===
+    def animations_for(character):
+        return spirit_assets.animations_for(manifest, base_path, character)
 
-    def sprite_path(action, frame_count):
-        return os.path.join(base_path, f"{monster}/{monster}_{action}_{frame_count}.png")
+    # === Atlas build step (no display needed) ===
+    if args.build_atlas:
+        build_atlases(base_path, monster_list, animations_for,
+                      lambda name: spirit_assets.frame_size(manifest, name), raw=args.raw)
+        spirit_assets.write(manifest, os.path.join(base_path, spirit_assets.MANIFEST_NAME))  # For frozen builds
+        sys.exit(0)
 
+    app = QApplication(sys.argv)
+    startup.mark("qapplication")
+
+    # === Control socket, claimed before any spirit shows; commands wait for the event loop ===
+    control = ControlServer(lambda argv: handle_command(argv))
+    if not control.listen():
+        # Another launch claimed it since we looked above, so this one hands over after all
+        reply = forward(sys.argv[1:])
+        if reply is not None:
+            hand_over(reply)
+        print("[ERROR] Control socket taken by an instance that stopped answering")
+    print(f"[INFO] Loaded spirit: {monster}")
 
-    # === Animations dictionary ===
-    animations = {
-        "walk": (sprite_path("Walk", 6), 6),
-        "run": (sprite_path("Run", 6), 6),
-        "idle": (sprite_path("Idle", 4), 4),
-        "jump": (sprite_path("Jump", 8), 8),
-        "hurt": (sprite_path("Hurt", 4), 4),
-        "climb": (sprite_path("Climb", 4), 4),
-        "death": (sprite_path("Death", 8), 8),
-        "attack1": (sprite_path("Attack1", 4), 4),
-        "attack2": (sprite_path("Attack2", 6), 6),
-        "walk_attack": (sprite_path("Walk+Attack", 6), 6),
-    }
-
-    # === Create and show spirit ===
-    spirit = Spirit(
-        frame_width=32,
-        frame_height=32,
-        animations=animations,
-        start_state="walk"
-    )
-    spirit.show()
-    spirit.update_health_bar()
+    frame_atlas.open_index(os.path.join(base_path, "atlas.json"))
+    animations = animations_for(monster)
+
+    # === Create and show spirits ===
+    world = SpiritWorld(ScreenIndex(app, scale=args.scale), tick_ms=tick_ms_for(args.tick_rate))
+    world_clock = WorldClock(world)
+    compositor = OverlayCompositor(world.screens) if args.backend == "overlay" else None
+    world.cursor = cursor_position
+    if args.stats:
+        world.probe = WorldProbe(world, args.stats)
+    trace = None
+    if args.record:
+        from spirit_trace import TraceRecorder
+        trace = TraceRecorder(world, args.record)
+    spirits = []
+
+    def spawn_spirit():
+        frame_width, frame_height = spirit_assets.frame_size(manifest, monster)
+        spirit = Spirit(
+            frame_width=frame_width,
+            frame_height=frame_height,
+            animations=animations,
+            start_state="walk",
+            character=monster,
+            world=world
+        )
+        if spirits:
+            # Extra spirits are scattered over every screen
+            spirit.model.scatter()
+        spirits.append(spirit)
+        if compositor is not None:
+            compositor.add(spirit)
+        else:
+            spirit.show()
+        return spirit
+
+    def set_spirit_count(count):
+        os.environ["SPIRIT_COUNT"] = str(count)  # Survives a character switch
+        while len(spirits) < count:
+            spawn_spirit()
+        while len(spirits) > max(1, count):
+            spirit = spirits.pop()
+            if compositor is not None:
+                compositor.remove(spirit)
+            spirit.dispose()
+
+    set_spirit_count(max(1, args.count))
+    spirit = spirits[0]
+    world_clock.start()
+    power = PowerPolicy(world_clock, spirits, forced=None if args.power == "auto" else args.power)
+    spirit.model.update_health_bar()
+    startup.mark("assets")
     print("[DEBUG] Sprite pos:", spirit.x(), spirit.y())
     print("[DEBUG] Health bar pos:", spirit.health_bar.x(), spirit.health_bar.y())
-    # === Create system tray icon ===
-    tray_icon = QSystemTrayIcon()
-    tray_icon.setIcon(QIcon(icon_path))  # Use resource path here
-    tray_icon.setVisible(True)
-    tray_icon.showMessage("Desktop Spirit", f"{monster.replace('_', ' ')} is active!", QSystemTrayIcon.Information, 3000)
 
-    # === Tray menu ===
-    tray_menu = QMenu()
-
-    # === Character Selection Submenu ===
-    character_menu = QMenu("Change Character")
-    monster_list = ["Pink_Monster", "Owlet_Monster", "Dude_Monster"]
+    tray_icon = None
+    stats_overlay = None
+
+    def toggle_stats(enabled):
+        # The tray toggle records to --stats if given, otherwise only feeds the overlay
+        global stats_overlay
+        if stats_overlay is None:
+            stats_overlay = StatsOverlay()
+            corner = world.screens.rects[world.screens.primary]
+            stats_overlay.move(corner.left + 10, corner.top + 10)
+        if enabled:
+            if world.probe is None:
+                world.probe = WorldProbe(world, args.stats)
+            world.probe.listeners.append(stats_overlay.show_snapshot)
+            stats_overlay.show()
+        else:
+            stats_overlay.hide()
+            if world.probe is not None:
+                world.probe.listeners.remove(stats_overlay.show_snapshot)
+                if not args.stats:
+                    world.probe = None
+
+    def switch_character(monster_name):
+        # Live swap: reuse the running app and keep every spirit where it is
+        global monster, animations
+        os.environ["SPIRIT_CHARACTER"] = monster_name  # Still honoured by the next launch
+        monster = random.choice(monster_list) if monster_name == "RANDOM" else monster_name
+        animations = animations_for(monster)
+        for spirit in spirits:
+            spirit.set_character(monster, animations, *spirit_assets.frame_size(manifest, monster))
+        print(f"[INFO] Switched spirit: {monster}")
+        if tray_icon is not None:
+            tray_icon.showMessage("Desktop Spirit", f"{monster.replace('_', ' ')} is active!", QSystemTrayIcon.Information, 3000)
 
     def make_switch_character(monster_name):
-        def switch():
-            os.environ["SPIRIT_CHARACTER"] = monster_name
-            os.execl(sys.executable, sys.executable, *sys.argv)
-        return switch
-
-    # Add each monster to the character submenu
-    for name in monster_list:
-        display_name = name.replace("_", " ")
-        action = QAction(display_name, tray_menu)
-        action.triggered.connect(make_switch_character(name))
-        character_menu.addAction(action)
-
-    # Add random option
-    random_action = QAction("Random", tray_menu)
-    random_action.triggered.connect(make_switch_character("RANDOM"))
-    character_menu.addAction(random_action)
-
-    # Add the character menu to the tray
-    tray_menu.addMenu(character_menu)
-
-    # === Quit Action ===
-    tray_menu.addSeparator()
-    quit_action = QAction("Quit", tray_menu)
-    quit_action.triggered.connect(QApplication.quit)
-    tray_menu.addAction(quit_action)
-
-    # === Assign menu to tray icon ===
-    tray_icon.setContextMenu(tray_menu)
+        return lambda: switch_character(monster_name)
+
+    def make_set_count(count):
+        return lambda: set_spirit_count(count)
+
+    def setup_tray():
+        # Not needed for the first frame, so it runs once the spirit is on screen
+        global tray_icon, tray_menu
+        tray_icon = QSystemTrayIcon()
+        tray_icon.setIcon(QIcon(icon_path))  # Use resource path here
+        tray_icon.setVisible(True)
+        tray_icon.showMessage("Desktop Spirit", f"{monster.replace('_', ' ')} is active!", QSystemTrayIcon.Information, 3000)
+
+        # === Tray menu ===
+        tray_menu = QMenu()
+
+        # === Character Selection Submenu ===
+        character_menu = QMenu("Change Character", tray_menu)
+
+        # Add each monster to the character submenu
+        for name in monster_list:
+            display_name = name.replace("_", " ")
+            action = QAction(display_name, tray_menu)
+            action.triggered.connect(make_switch_character(name))
+            character_menu.addAction(action)
+
+        # Add random option
+        random_action = QAction("Random", tray_menu)
+        random_action.triggered.connect(make_switch_character("RANDOM"))
+        character_menu.addAction(random_action)
+
+        # Add the character menu to the tray
+        tray_menu.addMenu(character_menu)
+
+        # === Spirit Count Submenu ===
+        count_menu = QMenu("Spirits", tray_menu)
+
+        for count in (1, 5, 10, 25, 50, 100, 200):
+            action = QAction(str(count), tray_menu)
+            action.triggered.connect(make_set_count(count))
+            count_menu.addAction(action)
+
+        tray_menu.addMenu(count_menu)
+
+        # === Instrumentation overlay ===
+        stats_action = QAction("Show Stats", tray_menu)
+        stats_action.setCheckable(True)
+        stats_action.toggled.connect(toggle_stats)
+        tray_menu.addAction(stats_action)
+
+        # === Quit Action ===
+        tray_menu.addSeparator()
+        quit_action = QAction("Quit", tray_menu)
+        quit_action.triggered.connect(QApplication.quit)
+        tray_menu.addAction(quit_action)
+
+        # === Assign menu to tray icon ===
+        tray_icon.setContextMenu(tray_menu)
+
+    def finish_startup():
+        # Runs after the first spirit has been painted (or after a second, if it never is)
+        if tray_icon is not None:
+            return
+        startup.mark("first paint")
+        power.evaluate()
+        setup_tray()
+        startup.mark("tray")
+        startup.report()
+        # === Preload as many other characters as the atlas keeps idle, once the event loop is running ===
+        others = [name for name in monster_list if name not in frame_atlas.characters]
+        for name in others[:FrameAtlas.IDLE_CHARACTERS]:
+            frame_atlas.request(name, animations_for(name), *spirit_assets.frame_size(manifest, name), priority=0)
+
+    # === Control socket ===
+    def run_command(name, params):
+        if name in ("spawn", "remove"):
+            n = int(params[0]) if params else 1
+            set_spirit_count(len(spirits) + (n if name == "spawn" else -n))
+            return f"{len(spirits)} spirit(s)"
+        if name == "count":
+            set_spirit_count(max(1, int(params[0])))
+            return f"{len(spirits)} spirit(s)"
+        if name == "character":
+            if params[0] != "RANDOM" and params[0] not in monster_list:
+                raise ValueError(f"unknown character '{params[0]}' (have {', '.join(monster_list)}, RANDOM)")
+            switch_character(params[0])
+            return f"Switched to {monster}"
+        if name == "tick-rate":
+            world_clock.set_tick_rate(float(params[0]))  # tick_ms_for rejects rates that aren't above 0
+            return f"Ticking every {world.tick_ms} ms"
+        if name == "power":
+            if params[0] not in ("auto",) + spirit_power.TIERS:
+                raise ValueError(f"unknown power tier '{params[0]}'")
+            power.force(None if params[0] == "auto" else params[0])
+            return f"Power tier {power.tier}" + (" (pinned)" if power.forced else "")
+        if name == "quit":
+            QTimer.singleShot(0, QApplication.quit)  # After the reply has gone out
+            return "Quitting"
+
+    def handle_command(argv):
+        options, _ = parser.parse_known_args(argv)
+        if not options.command or options.command[0] not in control_commands:
+            # A plain relaunch: apply whatever it set on the command line (checked like the
+            # commands are), and say we're here
+            defaults, _ = parser.parse_known_args([])
+            for name, option in (("count", "count"), ("tick-rate", "tick_rate"), ("power", "power")):
+                value = getattr(options, option)
+                if value != getattr(defaults, option):
+                    reply = command_reply(name, [str(value)])
+                    if not reply["ok"]:
+                        return reply
+            if tray_icon is not None:
+                tray_icon.showMessage("Desktop Spirit", "Already running", QSystemTrayIcon.Information, 3000)
+            return {"ok": True, "message": "Desktop Spirit is already running"}
+        name, params = options.command[0], options.command[1:]
+        if name == "stats":
+            rss = current_rss()
+            stats = {
+                "character": monster,
+                "spirits": len(spirits),
+                "tick_ms": world.tick_ms,
+                "power": power.tier,
+                "power_pinned": power.forced is not None,
+                "ticks": world.ticks,
+                "callbacks": world.fired,
+                "moves": world.moves,
+                "transitions": world.transitions,
+                "encounters": world.encounters,
+                "rss_mb": rss / (1 << 20) if rss is not None else None,
+                "memory": {"per_spirit": world.memory(), "frames": frame_atlas.memory()},
+                "probe": world.probe.latest if world.probe is not None else None,
+            }
+            return {"ok": True, "message": f"{len(spirits)} spirit(s) running", "stats": stats}
+        return command_reply(name, params)
+
+    def command_reply(name, params):
+        try:
+            message = run_command(name, params)
+        except IndexError:
+            return {"ok": False, "message": f"{name}: missing argument"}
+        except ValueError as e:
+            return {"ok": False, "message": f"{name}: {e}"}
+        print(f"[INFO] Control: {' '.join([name] + params)}")
+        return {"ok": True, "message": message}
+
+    for widget in (compositor.overlays if compositor is not None else [spirit]):
+        FirstPaint(widget, finish_startup)
+    QTimer.singleShot(1000, finish_startup)
+
+    # === Print cache stats on shutdown ===
+    app.aboutToQuit.connect(frame_atlas.report)
+    app.aboutToQuit.connect(world.report)
+    app.aboutToQuit.connect(HealthBar.report)
+    if compositor is not None:
+        app.aboutToQuit.connect(compositor.report)
+    app.aboutToQuit.connect(power.report)
+    app.aboutToQuit.connect(control.report)
+    if trace is not None:
+        app.aboutToQuit.connect(trace.close)
+
+    def flush_stats():
+        # Keep the partial window that was still being collected
+        if world.probe is not None:
+            world.probe.flush(world.now)
+
+    app.aboutToQuit.connect(flush_stats)
 
     # === Start application ===
     sys.exit(app.exec_())
@@ -0,0 +1,147 @@
+""" Sprite manifest: scans tiny-hero-sprites/ once and caches the result (no Qt dependency) """
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+
+from spirit_engine import ANIMATIONS
+
+MANIFEST_VERSION = 2  # 2: only the engine's states are listed
+MANIFEST_NAME = "manifest.json"  # Bundled copy written by --build-atlas
+
+# {Character}_{Action}_{N}.png, where Action may contain "+" (Walk+Attack)
+STRIP_PATTERN = re.compile(r"^(?P<character>.+?)_(?P<action>[^_]+)_(?P<count>\d+)\.png$")
+
+# Action name in the filename -> state name used by the engine
+STATES_BY_ACTION = {action: state for state, (action, _) in ANIMATIONS.items()}
+
+
+def cache_dir():
+    if sys.platform == "win32":
+        root = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(root, "DesktopSpirit")
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "desktop-spirit")
+
+
+def png_size(path):
+    # Width and height straight from the IHDR chunk, without decoding anything
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if len(header) < 24 or header[:8] != b"\x89PNG\r\n\x1a\n" or header[12:16] != b"IHDR":
+        raise ValueError("not a PNG file")
+    return struct.unpack(">II", header[16:24])
+
+
+def directory_mtimes(base):
+    # Adding, removing or renaming a strip touches its directory, and a new character touches base
+    mtimes = {".": os.path.getmtime(base)}
+    for entry in os.scandir(base):
+        if entry.is_dir():
+            mtimes[entry.name] = entry.stat().st_mtime
+    return mtimes
+
+
+def scan(base):
+    """ Walk every character folder and describe its strips; problems go to manifest["errors"] """
+    characters = {}
+    errors = []
+    for entry in sorted(os.scandir(base), key=lambda entry: entry.name):
+        if not entry.is_dir():
+            continue
+        character, states, sizes = entry.name, {}, set()
+        for name in sorted(os.listdir(entry.path)):
+            match = STRIP_PATTERN.match(name)
+            if match is None or match["character"] != character:
+                continue
+            action, frame_count = match["action"], int(match["count"])
+            if action not in STATES_BY_ACTION:
+                continue  # Push, Throw, ...: nothing would ever show them, so don't decode or pack them
+            try:
+                width, height = png_size(os.path.join(entry.path, name))
+            except (OSError, ValueError) as e:
+                errors.append(f"{character}/{name}: {e}")
+                continue
+            if frame_count <= 0 or width % frame_count:
+                errors.append(f"{character}/{name}: {width} px wide does not split into {frame_count} frames")
+                continue
+            states[STATES_BY_ACTION[action]] = {"file": f"{character}/{name}", "action": action,
+                                                "frame_count": frame_count}
+            sizes.add((width // frame_count, height))
+        if not states:
+            continue
+        if len(sizes) > 1:
+            errors.append(f"{character}: strips disagree on the frame size {sorted(sizes)}")
+            continue
+        missing = sorted(set(ANIMATIONS) - set(states))
+        if missing:
+            errors.append(f"{character}: missing {', '.join(missing)}")
+            continue
+        frame_width, frame_height = sizes.pop()
+        characters[character] = {"frame_width": frame_width, "frame_height": frame_height, "states": states}
+    return {
+        "version": MANIFEST_VERSION,
+        "base": os.path.abspath(base),
+        "mtimes": directory_mtimes(base),
+        "characters": characters,
+        "errors": errors,
+    }
+
+
+def cache_path(base):
+    key = hashlib.sha1(os.path.abspath(base).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir(), f"manifest-{key}.json")
+
+
+def read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def write(manifest, path):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+    except OSError as e:
+        print(f"[ERROR] Failed to write sprite manifest '{path}': {e}")
+
+
+def load_manifest(base):
+    """ The cached manifest while the sprite directories are unchanged, otherwise a fresh scan """
+    if hasattr(sys, '_MEIPASS'):
+        # Extracted bundles get fresh mtimes every launch, so trust the copy built with them
+        manifest = read(os.path.join(base, MANIFEST_NAME))
+        if manifest is not None:
+            return manifest
+
+    path = cache_path(base)
+    manifest = read(path)
+    try:
+        mtimes = directory_mtimes(base)
+    except OSError as e:
+        print(f"[ERROR] Failed to scan sprites in '{base}': {e}")
+        return {"version": MANIFEST_VERSION, "characters": {}, "errors": [str(e)]}
+    if manifest is None or manifest.get("mtimes") != mtimes:
+        manifest = scan(base)
+        write(manifest, path)
+    for error in manifest["errors"]:
+        print(f"[ERROR] Sprite manifest: {error}")
+    return manifest
+
+
+def animations_for(manifest, base, character):
+    # state -> (strip path, frame count), the shape Spirit and FrameAtlas expect
+    states = manifest["characters"][character]["states"]
+    return {state: (os.path.join(base, info["file"]), info["frame_count"]) for state, info in states.items()}
+
+
+def frame_size(manifest, character):
+    entry = manifest["characters"][character]
+    return entry["frame_width"], entry["frame_height"]
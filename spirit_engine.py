@@ -0,0 +1,1306 @@
+""" Headless spirit engine: behaviour, physics and scheduling with no Qt dependency """
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, namedtuple
+
+import numpy as np
+
+TICK_MS = 50  # Default tick (20 Hz); timers fire on the first tick at or after their deadline
+MAX_STEP_MS = 100  # Late ticks are caught up in motion steps no longer than this
+MAX_CATCH_UP_MS = 1000  # ... but only the last second of a longer stall is replayed
+
+# Motion speeds in px/s (the old per-tick steps at 20 Hz)
+WALK_SPEED = 60.0
+RUN_SPEED = 120.0
+CLIMB_SPEED = 100.0
+FALL_SPEED = 120.0  # Downward speed when a fall starts
+GRAVITY = 1200.0  # px/s^2 added to falling spirits
+TERMINAL_SPEED = 900.0
+
+# Spirit-spirit encounters and cursor proximity
+CELL_SIZE = 128  # SpatialGrid cell in px
+ENCOUNTER_MS = 200  # How often walkers look for each other
+ENCOUNTER_COOLDOWN_MS = 3000  # A spirit that just met someone ignores others this long
+CURSOR_MS = 100  # How often the shared cursor poll runs
+CURSOR_REACH = 16  # The cursor this close to a sprite counts as hovering it
+
+# Motion modes advanced by SpiritWorld.step_motion
+MOTION_NONE, MOTION_WALK, MOTION_FALL, MOTION_CLIMB, MOTION_CLIMB_DOWN = range(5)
+MOTION_NAMES = ["none", "walk", "fall", "climb", "climb_down"]
+
+# State names are stored as small ints in the packed state array
+STATE_NAMES = ["walk", "run", "idle", "jump", "hurt", "climb", "death", "attack1", "attack2", "walk_attack"]
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+# state -> (action name used in the sprite filenames, frame count)
+ANIMATIONS = {
+    "walk": ("Walk", 6),
+    "run": ("Run", 6),
+    "idle": ("Idle", 4),
+    "jump": ("Jump", 8),
+    "hurt": ("Hurt", 4),
+    "climb": ("Climb", 4),
+    "death": ("Death", 8),
+    "attack1": ("Attack1", 4),
+    "attack2": ("Attack2", 6),
+    "walk_attack": ("Walk+Attack", 6),
+}
+
+# Milliseconds per animation frame
+DEFAULT_FRAME_DELAY = 150
+FRAME_DELAYS = {"death": 300}  # Slow down death animation
+
+
+def frame_delay(state):
+    return FRAME_DELAYS.get(state, DEFAULT_FRAME_DELAY)
+
+
+def frame_rects(frame_count, frame_width, frame_height, y=0):
+    # Frames sit side by side in a horizontal strip
+    return [(i * frame_width, y, frame_width, frame_height) for i in range(frame_count)]
+
+
+def current_rss():
+    # Resident set size in bytes, or None where it can't be read cheaply
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Only the peak is available here; macOS reports bytes, everything else KiB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def state_code(name):
+    if name is None:
+        return -1
+    if name not in STATE_CODES:
+        STATE_CODES[name] = len(STATE_NAMES)
+        STATE_NAMES.append(name)
+    return STATE_CODES[name]
+
+
+class Rect(namedtuple("Rect", "left top right bottom")):
+    """ Screen rectangle with inclusive edges, same convention as QRect """
+
+    __slots__ = ()
+
+    @property
+    def width(self):
+        return self.right - self.left + 1
+
+    @property
+    def height(self):
+        return self.bottom - self.top + 1
+
+
+class ScreenLayout:
+    """ Screen topology: available rects, neighbours and cached point lookups """
+
+    def __init__(self):
+        self.rects = []  # available geometry per screen
+        self.edges = []  # full geometry per screen, for hit tests
+        self.geometries = np.zeros((0, 4), dtype=np.int32)
+        self.bounds = np.zeros((0, 4), dtype=np.int32)  # available geometry, same layout
+        self.left_of = np.zeros(0, dtype=np.int32)  # index of the screen touching our left edge, or -1
+        self.right_of = np.zeros(0, dtype=np.int32)
+        self.scales = np.ones(0, dtype=np.int32)  # integer sprite scale factor per screen
+        self.primary = 0
+        self.last_hit = 0
+        self.listeners = []
+
+    def update(self, geometries, available, primary=0, scales=None):
+        self.rects = [Rect(*rect) for rect in available]
+        self.scales = np.array(scales if scales is not None else [1] * len(self.rects), dtype=np.int32)
+        self.edges = [Rect(*rect) for rect in geometries]
+        self.geometries = np.array(self.edges, dtype=np.int32).reshape(-1, 4)
+        self.bounds = np.array(self.rects, dtype=np.int32).reshape(-1, 4)
+        self.primary = primary
+        self.last_hit = primary
+
+        # touching[i, j]: screen j starts right where screen i ends and they overlap vertically
+        left, top, right, bottom = self.geometries.T
+        touching = ((left[None, :] == right[:, None] + 1)
+                    & (top[None, :] <= bottom[:, None]) & (bottom[None, :] >= top[:, None]))
+        self.right_of = np.where(touching.any(axis=1), touching.argmax(axis=1), -1).astype(np.int32)
+        self.left_of = np.where(touching.any(axis=0), touching.argmax(axis=0), -1).astype(np.int32)
+
+        for listener in self.listeners:
+            listener()
+
+    def locate(self, x, y):
+        # Consecutive lookups almost always land on the same screen as the last one
+        left, top, right, bottom = self.edges[self.last_hit]
+        if left <= x <= right and top <= y <= bottom:
+            return self.last_hit
+        for index, (left, top, right, bottom) in enumerate(self.edges):
+            if left <= x <= right and top <= y <= bottom:
+                self.last_hit = index
+                return index
+        return self.primary
+
+    def locate_many(self, xs, ys):
+        # Returns (screen index, found) per point; points off every screen map to the primary
+        left, top, right, bottom = self.geometries.T
+        inside = ((xs[:, None] >= left) & (xs[:, None] <= right)
+                  & (ys[:, None] >= top) & (ys[:, None] <= bottom))
+        found = inside.any(axis=1)
+        return np.where(found, inside.argmax(axis=1), self.primary), found
+
+    def rect_at(self, x, y):
+        return self.rects[self.locate(x, y)]
+
+
+class WorldTimer:
+    """ QTimer look-alike that fires from the shared SpiritWorld clock """
+
+    __slots__ = ("world", "callback", "owner", "single_shot", "interval", "generation", "active")
+
+    def __init__(self, world, callback, owner=None, single_shot=False):
+        self.world = world
+        self.callback = callback
+        self.owner = owner
+        self.single_shot = single_shot
+        self.interval = 0
+        self.generation = 0
+        self.active = False
+
+    def start(self, interval=None):
+        if interval is not None:
+            self.interval = interval
+        # Bumping the generation invalidates whatever entry is still queued
+        self.generation += 1
+        self.active = True
+        self.world.push(self.world.now + self.interval, self, self.generation, self.owner)
+
+    def stop(self):
+        self.generation += 1
+        self.active = False
+
+    def isActive(self):
+        return self.active
+
+    def setSingleShot(self, single_shot):
+        self.single_shot = single_shot
+
+
+def summarize(stat, scale=1.0):
+    count, total, peak = stat
+    return {"n": count, "mean": round(total * scale / count, 1) if count else 0.0, "max": round(peak * scale, 1)}
+
+
+class WorldProbe:
+    """ Opt-in tick timings, timer lateness, transitions and process usage, rolled up into JSON lines """
+
+    def __init__(self, world, path=None, window_ms=1000, max_bytes=1 << 20):
+        self.world = world
+        self.path = path
+        self.window_ms = window_ms
+        self.max_bytes = max_bytes  # The file is rotated to path + ".1" past this size
+        self.listeners = []  # Called with every snapshot
+        self.latest = None
+        self.last_now = None
+        self.window_start = world.now
+        self.tick_started_at = 0.0
+        self.reset()
+
+    def reset(self):
+        self.ticks = 0
+        self.timings = {}  # phase or callback name -> [count, total s, max s]
+        self.lateness = {}  # timer interval in ms -> [count, total ms, max ms]
+        self.jitter = [0, 0.0, 0.0]  # |tick interval - tick_ms| in ms
+        self.transitions = Counter()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    @staticmethod
+    def add(table, key, value):
+        stat = table.get(key)
+        if stat is None:
+            table[key] = [1, value, value]
+            return
+        stat[0] += 1
+        stat[1] += value
+        if value > stat[2]:
+            stat[2] = value
+
+    def record(self, name, seconds):
+        self.add(self.timings, name, seconds)
+
+    def call(self, name, callback):
+        started = time.perf_counter()
+        callback()
+        self.add(self.timings, name, time.perf_counter() - started)
+
+    def timer_fired(self, interval, late):
+        self.add(self.lateness, interval, late)
+
+    def transition(self, state):
+        self.transitions[state] += 1
+
+    def tick_started(self, now):
+        if self.last_now is not None:
+            jitter = abs(now - self.last_now - self.world.tick_ms)
+            self.jitter[0] += 1
+            self.jitter[1] += jitter
+            self.jitter[2] = max(self.jitter[2], jitter)
+        self.last_now = now
+        self.ticks += 1
+        self.tick_started_at = time.perf_counter()
+
+    def tick_finished(self, now):
+        self.record("tick", time.perf_counter() - self.tick_started_at)
+        if now - self.window_start >= self.window_ms:
+            self.flush(now)
+
+    def flush(self, now):
+        wall, cpu = time.perf_counter(), time.process_time()
+        rss = current_rss()
+        world = self.world
+        motion = np.bincount(world.motion, minlength=len(MOTION_NAMES))
+        snapshot = {
+            "time": round(time.time(), 3),
+            "virtual_ms": now,
+            "window_ms": now - self.window_start,
+            "spirits": len(world.spirits),
+            "motion": {name: int(n) for name, n in zip(MOTION_NAMES, motion)},
+            "ticks": self.ticks,
+            "timings_us": {name: summarize(stat, 1e6) for name, stat in self.timings.items()},
+            "tick_jitter_ms": summarize(self.jitter),
+            "timer_lateness_ms": {str(interval): summarize(stat) for interval, stat in sorted(self.lateness.items())},
+            "transitions": dict(self.transitions),
+            "cpu_percent": round(100 * (cpu - self.cpu) / max(wall - self.wall, 1e-9), 1),
+            "rss_mb": round(rss / (1 << 20), 1) if rss is not None else None,
+        }
+        self.latest = snapshot
+        self.window_start = now
+        self.reset()
+        if self.path:
+            self.write(snapshot)
+        for listener in self.listeners:
+            listener(snapshot)
+        return snapshot
+
+    def write(self, snapshot):
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(snapshot, separators=(",", ":")) + "\n")
+        except OSError as e:
+            print(f"[ERROR] Failed to write stats to '{self.path}': {e}")
+            self.path = None
+
+
+class SpatialGrid:
+    """ Uniform grid over spirit centres, for neighbour and point queries without pairwise scans """
+
+    def __init__(self, cell=CELL_SIZE):
+        self.cell = cell
+        self.buckets = {}  # (column, row) -> {spirit: None}, ordered so replays visit spirits alike
+        self.cells = {}  # spirit -> (column, row)
+
+    def move(self, spirit, cell):
+        old = self.cells.get(spirit)
+        if old == cell:
+            return
+        if old is not None:
+            self.discard(old, spirit)
+        self.cells[spirit] = cell
+        self.buckets.setdefault(cell, {})[spirit] = None
+
+    def remove(self, spirit):
+        cell = self.cells.pop(spirit, None)
+        if cell is not None:
+            self.discard(cell, spirit)
+
+    def discard(self, cell, spirit):
+        bucket = self.buckets[cell]
+        bucket.pop(spirit, None)
+        if not bucket:
+            del self.buckets[cell]
+
+    def near(self, x, y, radius):
+        # Every spirit whose centre falls in a cell within radius of (x, y); callers do the exact test
+        cell = self.cell
+        for column in range(int((x - radius) // cell), int((x + radius) // cell) + 1):
+            for row in range(int((y - radius) // cell), int((y + radius) // cell) + 1):
+                bucket = self.buckets.get((column, row))
+                if bucket:
+                    yield from bucket
+
+
+class SpiritWorld:
+    """ Virtual clock that drives the timers, delayed calls and movement of every spirit """
+
+    # Packed per-spirit arrays, indexed by spirit.slot: (name, dtype, columns, fill)
+    ARRAYS = (
+        ("pos", np.float64, 2, 0),  # sub-pixel; views get the truncated ints
+        ("size", np.int32, 2, 0),
+        ("bounds", np.int32, 4, 0),  # left, top, right, bottom of the available screen
+        ("screen", np.int32, 0, 0),  # index into the ScreenLayout
+        ("speed", np.float64, 0, 0),  # px/s along the motion axis, already multiplied by scale
+        ("scale", np.int32, 0, 1),
+        ("direction", np.int8, 0, 1),
+        ("motion", np.int8, 0, MOTION_NONE),
+        ("state", np.int8, 0, -1),
+        ("fall_start", np.float64, 0, 0),
+        ("cell", np.int32, 2, np.iinfo(np.int32).min),  # SpatialGrid cell of the centre
+    )
+
+    def __init__(self, screens, tick_ms=TICK_MS, seed=None):
+        self.tick_ms = tick_ms
+        self.screens = screens
+        self.screens.listeners.append(self.refresh_screens)
+        self.random = random.Random(seed)
+        self.clock = lambda: self.now  # Replaced by a wall clock when driven from Qt
+        self.spirits = []
+        self.members = set()
+        self.queue = []  # heap of (deadline, seq, timer, generation or callback, owner)
+        self.seq = itertools.count()
+        self.now = 0
+        self.ticks = 0
+        self.fired = 0
+        self.moves = 0
+        self.transitions = 0
+        self.probe = None  # WorldProbe, when instrumentation is switched on
+        self.trace = None  # spirit_trace.TraceRecorder, when input is being recorded
+        self.on_input = None  # Called on mouse input to any spirit, e.g. to wake a frozen clock
+        self.cursor = None  # Returns the global cursor (x, y) when there is one to poll
+        self.grid = SpatialGrid()
+        self.cursor_near = set()  # spirits the cursor is currently hovering
+        self.encounters = 0
+        for name, dtype, columns, fill in self.ARRAYS:
+            shape = (0, columns) if columns else (0,)
+            setattr(self, name, np.full(shape, fill, dtype=dtype))
+
+        # One encounter check and one cursor poll for the whole world, not per spirit
+        self.timer(self.check_encounters).start(ENCOUNTER_MS)
+        self.timer(self.poll_cursor).start(CURSOR_MS)
+
+    def register(self, spirit):
+        spirit.slot = len(self.spirits)
+        self.spirits.append(spirit)
+        self.members.add(spirit)
+        for name, dtype, columns, fill in self.ARRAYS:
+            row = np.full((1, columns) if columns else (1,), fill, dtype=dtype)
+            setattr(self, name, np.concatenate((getattr(self, name), row)))
+        self.size[spirit.slot] = (spirit.frame_width, spirit.frame_height)
+
+    def unregister(self, spirit):
+        # Queued entries owned by the spirit are dropped lazily when they come due
+        if spirit not in self.members:
+            return
+        if self.trace is not None:
+            self.trace.removed(spirit)
+        self.members.discard(spirit)
+        self.grid.remove(spirit)
+        self.cursor_near.discard(spirit)
+
+        # Swap the last spirit into the freed slot so the arrays stay packed
+        slot, last = spirit.slot, len(self.spirits) - 1
+        moved = self.spirits.pop()
+        if slot != last:
+            self.spirits[slot] = moved
+            moved.slot = slot
+        for name, _, _, _ in self.ARRAYS:
+            values = getattr(self, name)
+            values[slot] = values[last]
+            setattr(self, name, values[:last].copy())
+
+    def place(self, spirit, x, y):
+        slot = spirit.slot
+        self.pos[slot] = (x, y)
+        width, height = self.size[slot]
+        index = self.screens.locate(x + width // 2, y + height // 2)
+        self.screen[slot] = index
+        self.bounds[slot] = self.screens.bounds[index]
+        if self.screens.scales[index] != self.scale[slot]:
+            spirit.set_scale(int(self.screens.scales[index]))
+        self.update_cell(slot)
+
+    def update_cell(self, slot):
+        width, height = self.size[slot]
+        cell = (int((self.pos[slot, 0] + width // 2) // self.grid.cell),
+                int((self.pos[slot, 1] + height // 2) // self.grid.cell))
+        if cell != tuple(self.cell[slot]):
+            self.cell[slot] = cell
+            self.grid.move(self.spirits[slot], cell)
+
+    def update_cells(self):
+        # Only spirits whose centre crossed into another cell touch the grid
+        cells = ((self.pos + self.size // 2) // self.grid.cell).astype(np.int32)
+        changed = np.flatnonzero((cells != self.cell).any(axis=1))
+        if not len(changed):
+            return
+        self.cell[changed] = cells[changed]
+        spirits = self.spirits
+        for slot in changed:
+            self.grid.move(spirits[slot], (int(cells[slot, 0]), int(cells[slot, 1])))
+
+    def refresh_screens(self):
+        # Re-home every spirit after a monitor was plugged in, unplugged or resized
+        if not self.spirits:
+            return
+        centre = self.pos + self.size // 2
+        index, found = self.screens.locate_many(centre[:, 0], centre[:, 1])
+        self.screen[:] = index
+        self.bounds[:] = self.screens.bounds[index]
+        self.rescale()
+
+        # Spirits left on a screen that went away are dropped onto the floor of the primary one
+        left, top, right, bottom = self.bounds.T
+        for slot in np.flatnonzero(~found):
+            x = int(min(max(self.pos[slot, 0], left[slot]), right[slot] - self.size[slot, 0]))
+            y = int(bottom[slot] - self.size[slot, 1] - 50)
+            self.pos[slot] = (x, y)
+            self.spirits[slot].view.moved(x, y)
+        self.update_cells()
+
+    def rescale(self):
+        # Spirits now on a screen with another scale factor take on its size and speed
+        wanted = self.screens.scales[self.screen]
+        for slot in np.flatnonzero(wanted != self.scale):
+            self.spirits[slot].set_scale(int(wanted[slot]))
+
+    def set_motion(self, spirit, motion, speed=0):
+        slot = spirit.slot
+        self.motion[slot] = motion
+        self.speed[slot] = speed * self.scale[slot]
+        if motion == MOTION_FALL:
+            self.fall_start[slot] = self.pos[slot, 1]
+
+    def stop_motion(self, spirit, motion=None):
+        if motion is None or self.motion[spirit.slot] == motion:
+            self.motion[spirit.slot] = MOTION_NONE
+
+    def step_motion(self, dt):
+        # One vectorized walk/fall/climb step of dt seconds for every moving spirit
+        motion = self.motion
+        active = motion != MOTION_NONE
+        if not active.any():
+            return
+        probe = self.probe
+        if probe is not None:
+            started = time.perf_counter()
+
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        left, top, right, bottom = self.bounds.T
+        width, height = self.size[:, 0], self.size[:, 1]
+        direction, speed = self.direction, self.speed
+        ground = bottom - height - 50
+        wall = np.where(direction == -1, left, right + 1 - width)
+
+        walk = motion == MOTION_WALK
+        fall = motion == MOTION_FALL
+        climb = motion == MOTION_CLIMB
+        climb_down = motion == MOTION_CLIMB_DOWN
+
+        # Gravity speeds falls up before they move (semi-implicit Euler)
+        if fall.any():
+            speed[fall] = np.minimum(speed[fall] + GRAVITY * dt, TERMINAL_SPEED)
+        step = speed * dt
+        new_x = np.where(walk, x + direction * step, np.where(climb | climb_down, wall, x))
+        new_y = np.where(walk, ground, np.where(climb, y - step, np.where(fall | climb_down, y + step, y)))
+
+        # Climbers stop short of the top/bottom instead of moving onto it
+        reached_top = climb & (new_y <= top)
+        reached_bottom = climb_down & (new_y >= ground)
+        landed = fall & (new_y >= ground)
+        hold = reached_top | reached_bottom
+        new_x = np.where(hold, x, new_x)
+        new_y = np.where(hold, y, np.where(landed, ground, new_y))
+
+        mid_screen = (left + right) // 2
+        zone = 10 * self.scale
+        mid = walk & (mid_screen - zone < new_x) & (new_x < mid_screen + zone)
+
+        # Walkers only turn around where there is no neighbouring screen to walk onto
+        screens = self.screens
+        neighbour = np.where(direction == 1, screens.right_of[self.screen], screens.left_of[self.screen])
+        at_edge = walk & (neighbour < 0) & (((direction == 1) & (new_x + width >= right))
+                                           | ((direction == -1) & (new_x <= left)))
+        if at_edge.any():
+            new_x = np.where(at_edge, np.clip(new_x, left, right - width), new_x)
+        centre = new_x + width // 2
+        crossed = walk & (neighbour >= 0) & np.where(direction == 1, centre > right, centre < left)
+        crossing = crossed.any()
+        if crossing:
+            self.screen[crossed] = neighbour[crossed]
+            self.bounds[crossed] = screens.bounds[neighbour[crossed]]
+
+        # Views only hear about whole-pixel moves
+        px, py = new_x.astype(np.int32), new_y.astype(np.int32)
+        changed = np.flatnonzero(active & ((px != x.astype(np.int32)) | (py != y.astype(np.int32))))
+        x[:] = new_x
+        y[:] = new_y
+        self.moves += len(changed)
+        spirits = self.spirits
+        for slot in changed:
+            spirits[slot].view.moved(int(px[slot]), int(py[slot]))
+        if crossing:
+            self.rescale()
+        self.update_cells()
+        if probe is not None:
+            now = time.perf_counter()
+            probe.record("step_motion", now - started)
+            started = now
+
+        # Per-spirit follow-ups only for the few spirits that hit something this tick.
+        # The mid-screen jump is 5% per 50 ms in the zone, whatever the step length.
+        jump_chance = 1 - 0.95 ** (dt / 0.05)
+        for slot in np.flatnonzero(mid):
+            if self.random.random() < jump_chance:
+                at_edge[slot] = False
+                spirits[slot].reach_mid_screen()
+        for slot in np.flatnonzero(at_edge):
+            spirits[slot].pause_and_flip()
+        for slot in np.flatnonzero(reached_top):
+            spirits[slot].reach_top()
+        for slot in np.flatnonzero(reached_bottom):
+            spirits[slot].reach_bottom()
+        for slot in np.flatnonzero(landed):
+            spirits[slot].land(int(new_y[slot] - self.fall_start[slot]))
+        if probe is not None:
+            # Mid-screen jumps, edge flips, climb ends and landings
+            probe.record("motion_events", time.perf_counter() - started)
+
+    def input(self):
+        if self.on_input is not None:
+            self.on_input()
+
+    def spirits_near(self, x, y, radius=0):
+        # Spirits whose rect is within radius of the point; radius 0 is a plain hit test
+        reach = radius + (int(self.size.max()) // 2 + 1 if len(self.spirits) else 0)
+        found = []
+        for spirit in self.grid.near(x, y, reach):
+            slot = spirit.slot
+            left, top = self.pos[slot]
+            width, height = self.size[slot]
+            dx = max(left - x, 0, x - (left + width - 1))
+            dy = max(top - y, 0, y - (top + height - 1))
+            if dx * dx + dy * dy <= radius * radius:
+                found.append(spirit)
+        return found
+
+    def neighbours(self, spirit, radius):
+        slot = spirit.slot
+        width, height = self.size[slot]
+        x, y = self.pos[slot] + (width / 2, height / 2)
+        return [other for other in self.spirits_near(x, y, radius + max(width, height) / 2) if other is not spirit]
+
+    def check_encounters(self):
+        # Walkers that ran into each other bump, turn around or fight; the grid keeps this near O(N)
+        walking = np.flatnonzero(self.motion == MOTION_WALK)
+        if len(walking) < 2:
+            return
+        now, spirits = self.now, self.spirits
+        for slot in walking:
+            spirit = spirits[slot]
+            if spirit.next_encounter > now or spirit.locked or spirit.dragging:
+                continue
+            width, height = self.size[slot]
+            centre_x, centre_y = self.pos[slot] + (width / 2, height / 2)
+            for other in self.grid.near(centre_x, centre_y, width):
+                other_slot = other.slot
+                if (other is spirit or self.motion[other_slot] != MOTION_WALK
+                        or other.next_encounter > now or other.locked or other.dragging):
+                    continue
+                other_width, other_height = self.size[other_slot]
+                dx = self.pos[other_slot, 0] + other_width / 2 - centre_x
+                dy = self.pos[other_slot, 1] + other_height / 2 - centre_y
+                # Overlapping by a good part of a body, with the other one ahead of us
+                if abs(dx) > (width + other_width) * 0.375 or abs(dy) > height / 2:
+                    continue
+                if dx * self.direction[slot] <= 0:
+                    continue
+                self.encounters += 1
+                spirit.meet(other)
+                break
+
+    def poll_cursor(self):
+        # One shared poll instead of per-window enter/leave events
+        if self.cursor is None:
+            return
+        x, y = self.cursor()
+        near = set(self.spirits_near(x, y, CURSOR_REACH))
+        for spirit in self.cursor_near - near:
+            spirit.hover_leave()
+        # Slot order, not set order, so a replayed trace draws the same random numbers
+        for spirit in sorted(near - self.cursor_near, key=lambda spirit: spirit.slot):
+            spirit.hover_enter()
+        self.cursor_near = near
+
+    def timer(self, callback, owner=None, single_shot=False):
+        return WorldTimer(self, callback, owner, single_shot)
+
+    def single_shot(self, delay, callback, owner=None):
+        self.push(self.now + delay, None, callback, owner)
+
+    def push(self, deadline, timer, payload, owner):
+        heapq.heappush(self.queue, (deadline, next(self.seq), timer, payload, owner))
+
+    def advance(self, now):
+        # A late tick is replayed in short steps, so motion and timers keep their order and speed
+        probe = self.probe
+        if probe is not None:
+            probe.tick_started(now)
+        if self.trace is not None:
+            self.trace.tick_started(now)
+        self.ticks += 1
+        if now - self.now > MAX_CATCH_UP_MS:
+            self.now = now - MAX_CATCH_UP_MS
+        while self.now < now:
+            step_end = min(now, self.now + MAX_STEP_MS)
+            dt = (step_end - self.now) / 1000
+            self.now = step_end
+            self.step_motion(dt)
+            self.fire_due(step_end)
+        if probe is not None:
+            probe.tick_finished(now)
+        if self.trace is not None:
+            self.trace.tick_finished()
+
+    def fire_due(self, now):
+        # Everything that came due by now, earliest deadline first
+        probe = self.probe
+        queue = self.queue
+        while queue and queue[0][0] <= now:
+            deadline, _, timer, payload, owner = heapq.heappop(queue)
+            if owner is not None and owner not in self.members:
+                continue
+            if timer is None:
+                self.fired += 1
+                if probe is None:
+                    payload()
+                else:
+                    probe.call("call_later", payload)
+                continue
+            if payload != timer.generation:
+                continue  # Stopped or restarted since this entry was queued
+            if timer.single_shot:
+                timer.active = False
+            else:
+                # Keep the cadence, but don't replay ticks we slept through
+                next_deadline = deadline + timer.interval
+                if next_deadline <= now:
+                    next_deadline = now + timer.interval
+                self.push(next_deadline, timer, timer.generation, owner)
+            self.fired += 1
+            if probe is None:
+                timer.callback()
+            else:
+                probe.timer_fired(timer.interval, now - deadline)
+                probe.call(timer.callback.__name__, timer.callback)
+
+    def run_for(self, duration):
+        # Fast-forward the virtual clock tick by tick, as fast as the host allows
+        end = self.now + duration
+        while self.now < end:
+            self.advance(self.now + self.tick_ms)
+
+    def memory(self):
+        """ Average bytes each spirit costs: its model, its timers, its array rows and its queued entries """
+        count = len(self.spirits)
+        row = sum(np.dtype(dtype).itemsize * (columns or 1) for _, dtype, columns, _ in self.ARRAYS)
+        if not count:
+            return {"spirits": 0, "model": 0, "timers": 0, "arrays": row, "queued": 0, "total": 0}
+        model = sum(sys.getsizeof(spirit) for spirit in self.spirits)
+        timers = sum(sys.getsizeof(timer) for spirit in self.spirits
+                     for timer in (spirit.animation_timer, spirit.jump_timer,
+                                   spirit.climb_check_timer, spirit.heal_timer))
+        queued = sum(sys.getsizeof(entry) for entry in self.queue if entry[4] is not None)
+        usage = {"spirits": count, "model": model // count, "timers": timers // count, "arrays": row,
+                 "queued": queued // count}
+        usage["total"] = usage["model"] + usage["timers"] + usage["arrays"] + usage["queued"]
+        return usage
+
+    def report(self):
+        print(f"[INFO] Spirit world: {len(self.spirits)} spirit(s), {self.ticks} ticks, "
+              f"{self.fired} callbacks, {self.moves} moves, {self.transitions} transitions, "
+              f"{self.encounters} encounters, "
+              f"{len(self.queue)} queued")
+        usage = self.memory()
+        if usage["spirits"]:
+            print(f"[INFO] Memory per spirit: {usage['total']} B ({usage['model']} B model, "
+                  f"{usage['timers']} B timers, {usage['arrays']} B packed state, {usage['queued']} B queued)")
+
+
+class NullView:
+    """ View that ignores everything, for headless runs """
+
+    def state_changed(self, state, direction):
+        pass
+
+    def frame_changed(self, index):
+        pass
+
+    def moved(self, x, y):
+        pass
+
+    def scale_changed(self, scale):
+        pass
+
+    def health_changed(self, health):
+        pass
+
+    def drag_changed(self, dragging):
+        pass
+
+
+class SpiritModel:
+    """ State machine, health and input handling of one spirit; the view only mirrors it """
+
+    # Every field is declared here: no per-spirit __dict__, and a typo'd attribute fails loudly.
+    # Position, direction, state and motion aren't fields at all but rows of the world's arrays.
+    __slots__ = (
+        "world", "view", "slot",
+        "base_width", "base_height", "frame_width", "frame_height", "frame_counts",
+        "current_frame", "frame_started", "previous_state",
+        "locked", "mouse_over", "can_attack", "next_encounter",
+        "dragging", "drag_start_time", "drag_start_pos",
+        "max_health", "health",
+        "animation_timer", "jump_timer", "climb_check_timer", "heal_timer",
+    )
+
+    def __init__(self, world, frame_width, frame_height, frame_counts, view=None):
+        # frame_width/height are the on-screen size: the artwork's size times the screen's scale
+        self.base_width = frame_width
+        self.base_height = frame_height
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.frame_counts = frame_counts
+        self.view = view if view is not None else NullView()
+
+        # Position, direction, state and motion live in the world's packed arrays
+        self.world = world
+        self.world.register(self)
+
+        self.direction = 1
+        self.current_frame = 0
+        self.frame_started = 0  # world time the current animation started
+        self.state = None
+        self.previous_state = None
+        self.locked = False  # locks state switching
+        self.mouse_over = False
+        self.can_attack = True
+        self.next_encounter = 0  # world time before which other spirits are ignored
+
+        self.dragging = False
+        self.drag_start_time = None
+        self.drag_start_pos = None
+
+        self.max_health = 5
+        self.health = self.max_health
+
+        # Timers (all driven by the shared world clock)
+        self.animation_timer = self.world.timer(self.update_frame, owner=self)
+        self.jump_timer = self.world.timer(self.try_jump, owner=self)
+        self.climb_check_timer = self.world.timer(self.try_climb_sequence, owner=self)
+        self.heal_timer = self.world.timer(self.restore_health, owner=self, single_shot=True)
+
+    def start(self, state="walk"):
+        if self.world.trace is not None:
+            self.world.trace.spawned(self, state)
+        self.jump_timer.start(1000)
+        self.climb_check_timer.start(3000)
+        self.update_health_bar()
+        self.set_state(state)
+        self.move_to_start()
+
+    @property
+    def direction(self):
+        return int(self.world.direction[self.slot])
+
+    @direction.setter
+    def direction(self, value):
+        self.world.direction[self.slot] = value
+
+    @property
+    def state(self):
+        code = self.world.state[self.slot]
+        return STATE_NAMES[code] if code >= 0 else None
+
+    @state.setter
+    def state(self, name):
+        self.world.state[self.slot] = state_code(name)
+
+    @property
+    def x(self):
+        return int(self.world.pos[self.slot, 0])
+
+    @property
+    def y(self):
+        return int(self.world.pos[self.slot, 1])
+
+    def move_to(self, x, y):
+        self.world.place(self, x, y)
+        self.view.moved(self.x, self.y)  # place() may have rescaled and shifted us
+
+    def set_scale(self, scale):
+        # Grow or shrink around the feet, so the spirit stays where it was standing
+        if scale != int(self.world.scale[self.slot]):
+            self.resize_frames(self.base_width, self.base_height, scale)
+
+    def set_frames(self, frame_counts, frame_width, frame_height):
+        # A character whose artwork has other frame counts or another size than the one it replaces
+        if self.world.trace is not None:
+            self.world.trace.frames_changed(self, frame_counts, frame_width, frame_height)
+        self.frame_counts = frame_counts
+        if (frame_width, frame_height) != (self.base_width, self.base_height):
+            self.resize_frames(frame_width, frame_height, int(self.world.scale[self.slot]))
+
+    def resize_frames(self, base_width, base_height, scale):
+        world, slot = self.world, self.slot
+        old = int(world.scale[slot])
+        self.base_width, self.base_height = base_width, base_height
+        width, height = base_width * scale, base_height * scale
+        old_width, old_height = (int(v) for v in world.size[slot])
+        world.scale[slot] = scale
+        world.speed[slot] *= scale / old
+        world.size[slot] = (width, height)
+        world.pos[slot] += ((old_width - width) / 2, old_height - height)
+        # ... but never past the edge of its screen, e.g. when spawned in a corner
+        left, top, right, bottom = (int(v) for v in world.bounds[slot])
+        world.pos[slot] = (min(max(world.pos[slot, 0], left), right - width),
+                           min(max(world.pos[slot, 1], top), bottom - height))
+        world.update_cell(slot)
+        self.frame_width, self.frame_height = width, height
+        self.view.scale_changed(scale)
+        self.view.moved(self.x, self.y)
+
+    def update_health_bar(self):
+        self.view.health_changed(self.health)
+
+    def call_later(self, delay, callback):
+        self.world.single_shot(delay, callback, owner=self)
+
+    # === Input ===
+
+    def hover_enter(self):
+        self.world.input()
+        if self.locked or self.mouse_over or not self.can_attack or self.state == "hurt":
+            return
+
+        self.mouse_over = True
+        self.can_attack = False  # disable until reset
+
+        if self.state == "walk":
+            self.set_state("walk_attack")
+            self.call_later(700, lambda: self.resume_from_attack("walk"))
+
+        elif self.state == "run":
+            self.set_state("walk_attack")
+            self.call_later(700, lambda: self.resume_from_attack("run"))
+
+        else:
+            attack_state = self.world.random.choice(["attack1", "attack2"])
+            previous = self.state if self.state in ("walk", "run") else "walk"
+            self.set_state(attack_state)
+            self.call_later(700, lambda: self.resume_from_attack(previous))
+
+    def hover_leave(self):
+        self.mouse_over = False
+
+    def press(self, x, y):
+        if self.world.trace is not None:
+            self.world.trace.mouse(self, "press", x, y)
+        self.world.input()
+        self.drag_start_time = self.world.clock()
+        self.drag_start_pos = (x, y)
+        self.dragging = True
+        self.view.drag_changed(True)
+
+        # Stop movement and fall/climb
+        self.world.stop_motion(self)
+
+        self.locked = True
+
+    def drag_to(self, x, y):
+        if self.world.trace is not None:
+            self.world.trace.mouse(self, "drag", x, y)
+        if self.dragging:
+            self.move_to(x, y)
+
+    def release(self, x, y):
+        if self.world.trace is not None:
+            self.world.trace.mouse(self, "release", x, y)
+        self.dragging = False
+        self.view.drag_changed(False)
+
+        if self.drag_start_time is None:
+            time_diff, dist = float("inf"), 0
+        else:
+            time_diff = (self.world.clock() - self.drag_start_time) / 1000
+            dist = abs(x - self.drag_start_pos[0]) + abs(y - self.drag_start_pos[1])
+
+        if time_diff < 0.3 and dist < 10:
+            # Treat as a click: apply damage
+            self.take_hit()
+        else:
+            self.set_state("idle")
+            self.start_falling()
+
+    # === Behaviour ===
+
+    def take_hit(self):
+        # One point of damage, from a click or a lost fight
+        self.health -= 1
+        self.update_health_bar()
+        self.heal_timer.start(10000)  # 10 seconds
+
+        if self.health <= 0:
+            self.locked = False
+            self.trigger_death_from_clicks()
+            return
+
+        if  self.state not in ("hurt", "death"):
+            self.locked = False
+            saved_previous = self.state if self.state in ("walk", "run") else "walk"
+            self.set_state("hurt")
+            self.call_later(700, lambda: self.restore_after_hurt(saved_previous))
+
+    def meet(self, other):
+        # Called by the world when two walkers collide
+        world = self.world
+        self.next_encounter = other.next_encounter = world.now + ENCOUNTER_COOLDOWN_MS
+        roll = world.random.random()
+        if roll < 0.5:
+            # Turn around
+            for spirit in (self, other):
+                spirit.flip_and_continue(spirit.state)
+        elif roll < 0.8:
+            # Bump: stop for a moment, then head back the way we came
+            for spirit in (self, other):
+                previous = spirit.state
+                spirit.set_state("idle")
+                spirit.call_later(500, lambda spirit=spirit, previous=previous: spirit.flip_and_continue(previous))
+        else:
+            # Fight: both attack, and the loser takes a hit once it's over
+            for spirit in (self, other):
+                previous = spirit.state
+                spirit.set_state(world.random.choice(["attack1", "attack2"]))
+                spirit.call_later(700, lambda spirit=spirit, previous=previous: spirit.resume_from_attack(previous))
+            loser = world.random.choice([self, other])
+            loser.call_later(700, loser.lose_fight)
+
+    def lose_fight(self):
+        # The fight's hit lands only on a free spirit: one that was picked up, started climbing or
+        # is dying meanwhile is spared, since take_hit would unlock it under the cursor
+        if self.dragging or self.locked:
+            return
+        self.take_hit()
+
+    def resume_from_attack(self, next_state):
+        if self.locked or self.state in ("hurt", "death"):
+            return  # Don't change state during hurt/death
+        self.set_state(next_state)
+        self.call_later(1000, lambda: setattr(self, 'can_attack', True))
+
+    def restore_state(self):
+        if not self.locked and self.previous_state:
+            self.set_state(self.previous_state)
+
+    def restore_health(self):
+        if self.health < self.max_health:
+            self.health = self.max_health
+            self.update_health_bar()
+            self.set_state("idle")  # or custom "heal" state
+            self.call_later(500, lambda: self.set_state("walk"))
+
+    def restore_after_hurt(self, previous):
+        if self.dragging:
+            return  # Picked up while hurt; the release decides what comes next
+        self.locked = False  # Always unlock!
+        if self.state == "hurt":
+            self.set_state(previous)
+
+    def trigger_death_from_clicks(self):
+        if self.locked:
+            return  # Already dying
+
+        self.locked = True
+
+        # Clear any other queued timers
+        self.animation_timer.stop()
+        self.world.stop_motion(self)
+        self.jump_timer.stop()
+        self.climb_check_timer.stop()
+
+        self.set_state("death")
+        self.call_later(2000, self.reset_spirit)
+
+    def try_climb_sequence(self):
+        if self.locked:
+            return
+        if self.state not in ("walk", "run", "idle", "hurt"):
+            return
+        # Only the outer edges are walls; a neighbouring screen is walked onto, not climbed
+        screen = self.screen_rect()
+        screens, index = self.world.screens, self.world.screen[self.slot]
+        at_left_edge = self.x <= screen.left and screens.left_of[index] < 0
+        at_right_edge = self.x + self.frame_width >= screen.right and screens.right_of[index] < 0
+
+        if at_left_edge or at_right_edge:
+            # The climb step picks its wall from the direction, so face the edge that was touched
+            self.direction = -1 if at_left_edge else 1
+            self.set_state("climb")
+            self.start_climbing()
+
+    def start_climbing(self):
+        self.locked = True
+        self.jump_timer.stop()
+        self.climb_check_timer.stop()
+        self.world.set_motion(self, MOTION_CLIMB, CLIMB_SPEED)
+
+    def reach_top(self):
+        # Called by the world's climb step once the spirit reaches the top of the screen
+        self.world.stop_motion(self)
+
+        if self.world.random.random() < 0.5:
+            self.set_state("idle")
+            self.start_falling()
+        else:
+            self.set_state("climb")
+            self.start_climbing_down()
+
+    def start_climbing_down(self):
+        self.world.set_motion(self, MOTION_CLIMB_DOWN, CLIMB_SPEED)
+
+    def reach_bottom(self):
+        self.world.stop_motion(self)
+        self.unlock_and_resume()
+
+    def start_falling(self):
+        self.world.set_motion(self, MOTION_FALL, FALL_SPEED)  # records where the fall started
+
+    def land(self, fall_distance):
+        # Called by the world's fall step once the spirit hits the ground
+        self.world.stop_motion(self)
+        half_screen = self.screen_rect().height // 2
+
+        if fall_distance > half_screen:
+            self.set_state("death")
+            self.call_later(1200, self.reset_spirit)
+        elif self.health > 0:
+            self.health -= 1
+            self.health = max(0, self.health)  # Clamp to 0
+            self.update_health_bar()
+            self.heal_timer.start(10000)
+
+            if self.health == 0:
+                self.locked = False
+                self.trigger_death_from_clicks()
+                return
+            self.locked = False
+            self.set_state("hurt")
+            self.call_later(700, self.unlock_and_resume)
+
+    def reset_spirit(self):
+        self.locked = False
+        self.health = self.max_health
+        self.update_health_bar()
+
+        screen = self.screen_rect()
+        self.direction = self.world.random.choice([-1, 1])
+        x = screen.left if self.direction == 1 else screen.right - self.frame_width
+        y = screen.bottom - self.frame_height - 50
+        self.move_to(x, y)
+        self.set_state("walk")
+
+    def unlock_and_resume(self):
+        self.locked = False
+        self.jump_timer.start(1000)
+        self.climb_check_timer.start(3000)
+        self.set_state("walk")
+
+    def scatter(self):
+        # Extra spirits start at a random spot on a random screen, walking either way
+        if self.world.trace is not None:
+            self.world.trace.scattered(self)
+        random = self.world.random
+        rect = random.choice(self.world.screens.rects)
+        self.move_to(random.randint(rect.left, rect.right - 2 * self.frame_width),
+                     rect.bottom - self.frame_height - 50)
+        self.direction = random.choice([-1, 1])
+        self.set_state("walk")
+
+    def move_to_start(self):
+        screen = self.screen_rect()
+        self.move_to(0, screen.height - self.frame_height - 50)
+
+    def screen_rect(self):
+        # Cached lookup in the world's screen layout
+        return self.world.screens.rects[self.world.screen[self.slot]]
+
+    def safe_set_state(self, state):
+        try:
+            self.set_state(state)
+        except Exception as e:
+            print(f"[ERROR] Failed to set state: {e}")
+            self.call_later(700, lambda: self.safe_set_state("walk"))
+
+    def set_state(self, new_state):
+        if new_state not in self.frame_counts:
+            print(f"[ERROR] Animation state '{new_state}' not found.")
+            return
+
+        if self.locked and new_state != "death":
+            return  # Prevent interruptions during death/climb
+
+        if self.state == "jump":
+            self.previous_state = self.previous_state or "walk"
+        elif self.state != "jump":
+            self.previous_state = self.state
+
+        self.state = new_state
+        self.world.transitions += 1
+        if self.world.probe is not None:
+            self.world.probe.transition(new_state)
+        self.current_frame = 0
+        self.frame_started = self.world.now
+        self.view.state_changed(new_state, self.direction)
+
+        self.animation_timer.start(frame_delay(new_state))
+
+        if new_state in ("walk", "run"):
+            self.world.set_motion(self, MOTION_WALK, WALK_SPEED if new_state == "walk" else RUN_SPEED)
+        else:
+            self.world.stop_motion(self, MOTION_WALK)
+
+    def update_frame(self):
+        # The frame follows elapsed time, so a late or coarse tick skips frames instead of slowing down
+        elapsed = self.world.now - self.frame_started
+        frame = int(elapsed // self.animation_timer.interval) % self.frame_counts[self.state]
+        if frame != self.current_frame:
+            self.current_frame = frame
+            self.view.frame_changed(frame)
+
+    def reach_mid_screen(self):
+        # Called by the world's walk step for the occasional jump in the middle of the screen
+        self.set_state("jump")
+        self.call_later(700, lambda: self.set_state(self.previous_state))
+
+    def pause_and_flip(self):
+        if self.locked:
+            return
+        self.world.stop_motion(self)
+        if self.state == "walk":
+            self.set_state("idle")
+            self.call_later(1000, lambda: self.flip_and_continue("run"))
+        elif self.state == "run":
+            self.health -= 1
+            self.update_health_bar()
+            self.heal_timer.start(10000)  # 10 seconds
+            if self.health <= 0:
+                self.locked = False
+                self.trigger_death_from_clicks()
+                return
+            self.set_state("hurt")
+            self.call_later(1000, lambda: self.flip_and_continue("walk"))
+
+    def flip_and_continue(self, next_state):
+        if self.locked:
+            return  # Prevent mid-climb flip
+        self.direction *= -1
+        self.set_state(next_state)
+
+    def try_jump(self):
+        if self.locked:
+            return
+        if self.state in ("walk", "run") and self.world.random.random() < 0.05:  # 5% chance
+            self.previous_state = self.state
+            self.set_state("jump")
+            self.call_later(700, lambda: self.set_state(self.previous_state))
+
+
+def tick_ms_for(rate):
+    # Tick length in whole ms for a rate in Hz
+    if not 0 < rate < float("inf"):
+        raise ValueError(f"tick rate must be above 0 Hz, got {rate}")
+    return max(1, round(1000 / rate))
+
+
+def tick_rate(value):
+    """ argparse type for --tick-rate: ticks per second, above 0 """
+    try:
+        rate = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid tick rate '{value}'")
+    if not 0 < rate < float("inf"):
+        raise argparse.ArgumentTypeError(f"tick rate must be above 0 Hz, got {value}")
+    return rate
+
+
+def benchmark(count, seconds, seed=0, width=1920, height=1080, stats=None, tick_ms=TICK_MS):
+    """ Simulate `count` spirits for `seconds` of virtual time as fast as possible """
+    screens = ScreenLayout()
+    screens.update([(0, 0, width - 1, height - 1)], [(0, 0, width - 1, height - 41)])
+    world = SpiritWorld(screens, tick_ms=tick_ms, seed=seed)
+    if stats:
+        world.probe = WorldProbe(world, stats)
+    frame_counts = {state: frame_count for state, (_, frame_count) in ANIMATIONS.items()}
+
+    for _ in range(count):
+        spirit = SpiritModel(world, 32, 32, frame_counts)
+        spirit.start("walk")
+        spirit.move_to(world.random.randint(0, width - 64), height - 32 - 90)
+
+    start = time.perf_counter()
+    world.run_for(seconds * 1000)
+    elapsed = time.perf_counter() - start
+    return {
+        "spirits": count,
+        "virtual_seconds": seconds,
+        "wall_seconds": elapsed,
+        "ticks": world.ticks,
+        "ticks_per_sec": world.ticks / elapsed,
+        "transitions": world.transitions,
+        "transitions_per_sec": world.transitions / elapsed,
+        "speedup": seconds / elapsed,
+        "bytes_per_spirit": world.memory()["total"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Desktop Spirit benchmark")
+    parser.add_argument("--spirits", type=int, default=200, help="number of simulated spirits")
+    parser.add_argument("--seconds", type=float, default=600, help="virtual seconds to simulate")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed")
+    parser.add_argument("--stats", metavar="PATH", help="append per-second timing snapshots to this JSON lines file")
+    parser.add_argument("--tick-rate", type=tick_rate, default=1000 / TICK_MS, help="simulation ticks per second")
+    args = parser.parse_args()
+
+    result = benchmark(args.spirits, args.seconds, args.seed, stats=args.stats, tick_ms=tick_ms_for(args.tick_rate))
+    print(f"[INFO] {result['spirits']} spirits, {result['virtual_seconds']:.0f} virtual s "
+          f"in {result['wall_seconds']:.2f} s ({result['speedup']:.0f}x real time)")
+    print(f"[INFO] {result['ticks_per_sec']:.0f} ticks/sec, "
+          f"{result['transitions_per_sec']:.0f} transitions/sec ({result['transitions']} total)")
+    print(f"[INFO] {result['bytes_per_spirit']} B per spirit outside the shared frames")
@@ -0,0 +1,169 @@
+""" Offline export of every character, state and direction to animated GIF/WebP/APNG (Pillow, no Qt) """
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import spirit_assets
+from spirit_engine import frame_delay, frame_rects
+
+EXPORT_VERSION = 1  # Bump when the rendering changes, so every output is redone
+FORMATS = {"gif": "GIF", "webp": "WEBP", "apng": "PNG"}  # file extension -> Pillow format
+DIRECTIONS = {1: "right", -1: "left"}  # Strips face right; left is the mirrored copy, as in the app
+INDEX_NAME = "export.json"
+
+
+def output_name(character, state, direction, scale, extension):
+    suffix = f"@{scale}x" if scale != 1 else ""
+    return os.path.join(character, f"{character}_{state}_{DIRECTIONS[direction]}{suffix}.{extension}")
+
+
+def input_key(job):
+    # Anything that changes the pixels or timing of an output changes its key
+    stat = os.stat(job["source"])
+    parts = (EXPORT_VERSION, stat.st_mtime_ns, stat.st_size, job["frame_count"], job["frame_width"],
+             job["frame_height"], job["delay"], job["direction"], job["scale"])
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def plan(manifest, base, out_dir, characters, scales, extensions):
+    """ One job per character x state x direction x scale, each writing every requested format """
+    jobs = []
+    for character in characters:
+        frame_width, frame_height = spirit_assets.frame_size(manifest, character)
+        animations = spirit_assets.animations_for(manifest, base, character)
+        for state, (source, frame_count) in animations.items():
+            for direction in DIRECTIONS:
+                for scale in scales:
+                    job = {
+                        "source": source, "state": state, "frame_count": frame_count,
+                        "frame_width": frame_width, "frame_height": frame_height,
+                        "delay": frame_delay(state), "direction": direction, "scale": scale,
+                    }
+                    job["key"] = input_key(job)
+                    job["outputs"] = {
+                        extension: output_name(character, state, direction, scale, extension)
+                        for extension in extensions
+                    }
+                    job["out_dir"] = out_dir
+                    jobs.append(job)
+    return jobs
+
+
+def render(job):
+    """ Pool worker: slice the strip like FrameAtlas does, then write each format """
+    from PIL import Image, ImageOps
+    started = time.perf_counter()
+    try:
+        with Image.open(job["source"]) as strip:
+            strip = strip.convert("RGBA")
+    except OSError as e:
+        return job, f"{os.path.basename(job['source'])}: {e}", 0.0
+    frames = []
+    for left, top, width, height in frame_rects(job["frame_count"], job["frame_width"], job["frame_height"]):
+        frame = strip.crop((left, top, left + width, top + height))
+        if job["direction"] == -1:
+            frame = ImageOps.mirror(frame)
+        if job["scale"] != 1:
+            # Nearest neighbour keeps the pixel art crisp
+            frame = frame.resize((width * job["scale"], height * job["scale"]), Image.NEAREST)
+        frames.append(frame)
+
+    for extension, name in job["outputs"].items():
+        path = os.path.join(job["out_dir"], name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        options = {"save_all": True, "append_images": frames[1:], "duration": job["delay"], "loop": 0}
+        if extension == "gif":
+            options.update(disposal=2, optimize=False)
+        elif extension == "webp":
+            options.update(lossless=True)
+        elif extension == "apng":
+            options.update(disposal=1)  # Clear to transparent between frames
+        frames[0].save(path, FORMATS[extension], **options)
+    return job, None, time.perf_counter() - started
+
+
+def read_index(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def export(base, out_dir, characters=None, scales=(1,), extensions=tuple(FORMATS), processes=None, force=False):
+    """ Render everything whose inputs changed since the last export; returns (written, skipped, errors, busy s) """
+    manifest = spirit_assets.load_manifest(base)
+    characters = sorted(manifest["characters"]) if not characters else characters
+    unknown = [name for name in characters if name not in manifest["characters"]]
+    if unknown:
+        raise ValueError(f"unknown character(s) {', '.join(unknown)}")
+
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    index = read_index(index_path)  # output name -> input key it was made from
+    jobs = []
+    skipped = 0
+    for job in plan(manifest, base, out_dir, characters, scales, extensions):
+        fresh = all(index.get(name) == job["key"] and os.path.exists(os.path.join(out_dir, name))
+                    for name in job["outputs"].values())
+        if fresh and not force:
+            skipped += 1
+        else:
+            jobs.append(job)
+
+    written, errors, busy = 0, [], 0.0
+    if jobs:
+        processes = processes or os.cpu_count() or 1
+        with multiprocessing.Pool(min(processes, len(jobs))) as pool:
+            for job, error, seconds in pool.imap_unordered(render, jobs):
+                if error is not None:
+                    errors.append(error)
+                    continue
+                busy += seconds
+                written += len(job["outputs"])
+                for name in job["outputs"].values():
+                    index[name] = job["key"]
+        os.makedirs(out_dir, exist_ok=True)
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+    return written, skipped, errors, busy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Desktop Spirit animations to GIF/WebP/APNG")
+    parser.add_argument("out_dir", help="directory to write <Character>/<Character>_<state>_<direction>.<ext> into")
+    parser.add_argument("--sprites", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "tiny-hero-sprites"),
+                        help="sprite folder to read (default: the bundled tiny-hero-sprites)")
+    parser.add_argument("--character", action="append", dest="characters",
+                        help="only this character (repeatable); default is every character in the manifest")
+    parser.add_argument("--scale", type=lambda value: max(1, int(value)), action="append", dest="scales",
+                        help="integer scale factor, nearest neighbour (repeatable; default 1)")
+    parser.add_argument("--format", action="append", dest="formats", choices=tuple(FORMATS),
+                        help="output format (repeatable; default all of gif, webp and apng)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="re-render even when the inputs are unchanged")
+    args = parser.parse_args()
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("[ERROR] Exporting needs Pillow: pip install Pillow")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    try:
+        written, skipped, errors, busy = export(args.sprites, args.out_dir, args.characters,
+                                                sorted(set(args.scales or [1])), tuple(args.formats or FORMATS),
+                                                args.jobs, args.force)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    for error in errors:
+        print(f"[ERROR] Failed to export {error}")
+    elapsed = time.perf_counter() - started
+    print(f"[INFO] Exported {written} file(s), {skipped} animation(s) unchanged, in {elapsed:.2f} s "
+          f"({busy:.2f} s of rendering across the pool)")
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,123 @@
+""" Session, fullscreen, battery and idle probes behind the spirit's power tiers (no Qt dependency) """
+import glob
+import os
+import sys
+
+# Power tiers, from cheapest to run to most expensive
+SUSPENDED = "suspended"  # World clock frozen, no timers at all
+REDUCED = "reduced"  # World clock frozen, idle animation at a few fps, no walking
+FULL = "full"
+TIERS = (FULL, REDUCED, SUSPENDED)
+
+REDUCED_IDLE_S = 5 * 60  # No input for this long drops to REDUCED
+SUSPENDED_IDLE_S = 60 * 60  # ... and for this long to SUSPENDED
+
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    user32 = ctypes.windll.user32
+    kernel32 = ctypes.windll.kernel32
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+    class SYSTEM_POWER_STATUS(ctypes.Structure):
+        _fields_ = [("ACLineStatus", wintypes.BYTE), ("BatteryFlag", wintypes.BYTE),
+                    ("BatteryLifePercent", wintypes.BYTE), ("SystemStatusFlag", wintypes.BYTE),
+                    ("BatteryLifeTime", wintypes.DWORD), ("BatteryFullLifeTime", wintypes.DWORD)]
+
+    class MONITORINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.DWORD), ("rcMonitor", wintypes.RECT),
+                    ("rcWork", wintypes.RECT), ("dwFlags", wintypes.DWORD)]
+
+
+def session_locked():
+    # The input desktop can't be opened while the lock screen (or a UAC prompt) owns it
+    if sys.platform != "win32":
+        return None
+    desktop = user32.OpenInputDesktop(0, False, 0x0100)  # DESKTOP_SWITCHDESKTOP
+    if not desktop:
+        return True
+    user32.CloseDesktop(desktop)
+    return False
+
+
+def fullscreen_app():
+    # A foreground window covering its whole monitor, other than the desktop itself or our own
+    # overlays, which take the foreground whenever a spirit on them is clicked
+    if sys.platform != "win32":
+        return None
+    window = user32.GetForegroundWindow()
+    if not window or window in (user32.GetDesktopWindow(), user32.GetShellWindow()):
+        return False
+    process = wintypes.DWORD()
+    user32.GetWindowThreadProcessId(window, ctypes.byref(process))
+    if process.value == os.getpid():
+        return False
+    rect = wintypes.RECT()
+    if not user32.GetWindowRect(window, ctypes.byref(rect)):
+        return False
+    info = MONITORINFO()
+    info.cbSize = ctypes.sizeof(info)
+    monitor = user32.MonitorFromWindow(window, 2)  # MONITOR_DEFAULTTONEAREST
+    if not user32.GetMonitorInfoW(monitor, ctypes.byref(info)):
+        return False
+    screen = info.rcMonitor
+    return (rect.left <= screen.left and rect.top <= screen.top
+            and rect.right >= screen.right and rect.bottom >= screen.bottom)
+
+
+def on_battery():
+    if sys.platform == "win32":
+        status = SYSTEM_POWER_STATUS()
+        if not kernel32.GetSystemPowerStatus(ctypes.byref(status)):
+            return None
+        return status.ACLineStatus == 0
+    supplies = glob.glob("/sys/class/power_supply/*")
+    if not supplies:
+        return None
+    discharging = False
+    for supply in supplies:
+        try:
+            with open(os.path.join(supply, "type")) as f:
+                kind = f.read().strip()
+            if kind == "Mains":
+                with open(os.path.join(supply, "online")) as f:
+                    if f.read().strip() == "1":
+                        return False
+            elif kind == "Battery":
+                with open(os.path.join(supply, "status")) as f:
+                    discharging = discharging or f.read().strip() == "Discharging"
+        except OSError:
+            continue
+    return discharging
+
+
+def idle_seconds():
+    # Time since the last keyboard or mouse input anywhere in the session
+    if sys.platform != "win32":
+        return None
+    info = LASTINPUTINFO()
+    info.cbSize = ctypes.sizeof(info)
+    if not user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    return ((kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000
+
+
+def probe_session():
+    """ Everything choose_tier looks at; None where the platform can't tell """
+    return {
+        "locked": session_locked(),
+        "fullscreen": fullscreen_app(),
+        "battery": on_battery(),
+        "idle": idle_seconds(),
+    }
+
+
+def choose_tier(locked=None, fullscreen=None, battery=None, idle=None):
+    if locked or fullscreen or (idle is not None and idle >= SUSPENDED_IDLE_S):
+        return SUSPENDED
+    if battery or (idle is not None and idle >= REDUCED_IDLE_S):
+        return REDUCED
+    return FULL
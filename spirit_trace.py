@@ -0,0 +1,370 @@
+""" Binary input traces: record a world's seed, ticks and mouse input, then replay and verify them (no Qt dependency) """
+import argparse
+import json
+import random
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from spirit_engine import ANIMATIONS, TICK_MS, ScreenLayout, SpiritModel, SpiritWorld, tick_ms_for, tick_rate
+
+MAGIC = b"SPTR"
+TRACE_VERSION = 1
+HEADER = struct.Struct("<4sBQI?")  # magic, version, seed, tick_ms, cursor polled
+
+# Record kinds; each record is one kind byte followed by its payload
+TICK, CHECK, CLOCK, CURSOR, PRESS, DRAG, RELEASE, SPAWN, SCATTER, REMOVE, FRAMES, SCREENS = range(1, 13)
+MOUSE_KINDS = {"press": PRESS, "drag": DRAG, "release": RELEASE}
+KIND_NAMES = {TICK: "tick", CHECK: "check", CLOCK: "clock", CURSOR: "cursor", PRESS: "press", DRAG: "drag",
+              RELEASE: "release", SPAWN: "spawn", SCATTER: "scatter", REMOVE: "remove", FRAMES: "frames",
+              SCREENS: "screens"}
+
+KIND = struct.Struct("<B")
+PAYLOADS = {
+    TICK: struct.Struct("<q"),  # world time the tick advanced to, ms
+    CHECK: struct.Struct("<I"),  # crc32 of the spirit state after that tick
+    CLOCK: struct.Struct("<q"),  # a world.clock() reading, in the order they were taken
+    CURSOR: struct.Struct("<ii"),
+    PRESS: struct.Struct("<Iii"),  # slot, x, y
+    DRAG: struct.Struct("<Iii"),
+    RELEASE: struct.Struct("<Iii"),
+    SCATTER: struct.Struct("<I"),
+    REMOVE: struct.Struct("<I"),
+}
+BLOB = struct.Struct("<I")  # SPAWN, FRAMES and SCREENS carry a length-prefixed JSON blob
+
+
+class TraceDiverged(Exception):
+    """ The replayed world did something the recorded one didn't """
+
+
+def state_checksum(world):
+    # Everything a behaviour or performance bug shows up in: position, motion, state, health, locks
+    crc = 0
+    for values in (world.pos, world.direction, world.motion, world.state, world.scale):
+        crc = zlib.crc32(values.tobytes(), crc)
+    flags = np.array([(spirit.health, spirit.current_frame, spirit.locked, spirit.dragging)
+                      for spirit in world.spirits], dtype=np.int32)
+    return zlib.crc32(flags.tobytes(), crc)
+
+
+def screen_layout(screens):
+    return {
+        "geometries": [list(rect) for rect in screens.edges],
+        "available": [list(rect) for rect in screens.rects],
+        "primary": int(screens.primary),
+        "scales": [int(scale) for scale in screens.scales],
+    }
+
+
+class TraceRecorder:
+    """ Writes everything that steers a SpiritWorld to a compact binary trace as it happens """
+
+    def __init__(self, world, path, seed=None):
+        # Attach before the first spirit is made, so the whole run follows from the seed
+        self.world = world
+        self.seed = seed if seed is not None else random.randrange(1 << 63)
+        world.random.seed(self.seed)
+        self.records = 0
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, TRACE_VERSION, self.seed, world.tick_ms, world.cursor is not None))
+        self.blob(None, screen_layout(world.screens))
+
+        # Wall clock and cursor readings are the only inputs the world pulls in itself
+        self.clock = world.clock
+        self.cursor = world.cursor
+        world.clock = self.read_clock
+        if world.cursor is not None:
+            world.cursor = self.read_cursor
+        world.screens.listeners.append(self.screens_changed)
+        world.trace = self
+
+    def write(self, kind, *values):
+        self.file.write(KIND.pack(kind) + PAYLOADS[kind].pack(*values))
+        self.records += 1
+
+    def blob(self, kind, value):
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        self.file.write((KIND.pack(kind) if kind is not None else b"") + BLOB.pack(len(data)) + data)
+        self.records += kind is not None
+
+    def read_clock(self):
+        now = self.clock()
+        self.write(CLOCK, now)
+        return now
+
+    def read_cursor(self):
+        x, y = self.cursor()
+        self.write(CURSOR, x, y)
+        return x, y
+
+    # === Hooks called by the world and its spirits ===
+
+    def tick_started(self, now):
+        self.write(TICK, now)
+
+    def tick_finished(self):
+        self.write(CHECK, state_checksum(self.world))
+        # A crashed or killed session never reaches close(); keep every finished tick on disk
+        self.file.flush()
+
+    def spawned(self, spirit, state):
+        self.blob(SPAWN, {"width": spirit.base_width, "height": spirit.base_height,
+                          "frame_counts": spirit.frame_counts, "state": state})
+
+    def scattered(self, spirit):
+        self.write(SCATTER, spirit.slot)
+
+    def removed(self, spirit):
+        self.write(REMOVE, spirit.slot)
+
+    def frames_changed(self, spirit, frame_counts, frame_width, frame_height):
+        self.blob(FRAMES, {"slot": spirit.slot, "width": frame_width, "height": frame_height,
+                           "frame_counts": frame_counts})
+
+    def mouse(self, spirit, action, x, y):
+        self.write(MOUSE_KINDS[action], spirit.slot, int(x), int(y))
+
+    def screens_changed(self):
+        self.blob(SCREENS, screen_layout(self.world.screens))
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.world.trace = None
+        self.world.clock = self.clock
+        if self.cursor is not None:
+            self.world.cursor = self.cursor
+        self.file.close()
+        print(f"[INFO] Trace: {self.records} records, seed {self.seed}, written to {self.file.name}")
+
+
+class TraceReplayer:
+    """ Rebuilds the recorded world and feeds the trace back through it as fast as it will go """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.path = path
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"'{path}' is too short to be a spirit trace")
+        magic, version, self.seed, self.tick_ms, polled = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != TRACE_VERSION:
+            raise ValueError(f"'{path}' is not a version {TRACE_VERSION} spirit trace")
+        self.offset = HEADER.size
+        layout = self.read_blob()
+        self.end, self.truncated = self.complete_end()
+
+        screens = ScreenLayout()
+        screens.update(**layout)
+        self.world = SpiritWorld(screens, tick_ms=self.tick_ms, seed=self.seed)
+        self.world.clock = self.next_clock
+        if polled:
+            self.world.cursor = self.next_cursor
+        self.ticks = 0
+        self.inputs = 0
+        self.now = 0
+        self.phases = dict.fromkeys(("setup", "input", "motion", "timers", "tick other", "verify"), 0.0)
+
+    def read_blob(self):
+        (length,) = BLOB.unpack_from(self.data, self.offset)
+        start = self.offset + BLOB.size
+        self.offset = start + length
+        return json.loads(self.data[start:self.offset])
+
+    def complete_end(self):
+        # A session that crashed or was killed leaves its last record cut off: replay up to the
+        # last complete CHECK, and say how many bytes were left over
+        data, offset, end = self.data, self.offset, self.offset
+        while offset < len(data):
+            kind = data[offset]
+            after = offset + KIND.size
+            if kind in PAYLOADS:
+                after += PAYLOADS[kind].size
+            elif kind in (SPAWN, FRAMES, SCREENS):
+                if after + BLOB.size > len(data):
+                    break
+                after += BLOB.size + BLOB.unpack_from(data, after)[0]
+            else:
+                raise ValueError(f"Unknown record kind {kind} at byte {offset}")
+            if after > len(data):
+                break
+            offset = after
+            if kind == CHECK:
+                end = offset
+        return end, len(data) - offset
+
+    def next_record(self):
+        if self.offset >= self.end:
+            return None, None
+        (kind,) = KIND.unpack_from(self.data, self.offset)
+        self.offset += KIND.size
+        if kind in PAYLOADS:
+            payload = PAYLOADS[kind]
+            values = payload.unpack_from(self.data, self.offset)
+            self.offset += payload.size
+            return kind, values
+        if kind in (SPAWN, FRAMES, SCREENS):
+            return kind, self.read_blob()
+        raise ValueError(f"Unknown record kind {kind} at byte {self.offset - 1}")
+
+    def expect(self, wanted):
+        kind, values = self.next_record()
+        if kind != wanted:
+            raise TraceDiverged(f"tick {self.ticks} at {self.now} ms: the world asked for "
+                                f"{KIND_NAMES[wanted]}, the trace has {KIND_NAMES.get(kind, 'the end')}")
+        return values
+
+    def next_clock(self):
+        return self.expect(CLOCK)[0]
+
+    def next_cursor(self):
+        return self.expect(CURSOR)
+
+    def timed(self, phase, method):
+        def run(*args):
+            started = time.perf_counter()
+            method(*args)
+            self.phases[phase] += time.perf_counter() - started
+        return run
+
+    def run(self):
+        """ Replay the whole trace; raises TraceDiverged at the first tick whose state differs """
+        world = self.world
+        # Instance attributes shadow the methods advance() calls, so they can be timed apart
+        world.step_motion = self.timed("motion", world.step_motion)
+        world.fire_due = self.timed("timers", world.fire_due)
+        started = time.perf_counter()
+        while True:
+            kind, values = self.next_record()
+            if kind is None:
+                break
+            phase_started = time.perf_counter()
+            if kind == TICK:
+                self.now = values[0]
+                inner = self.phases["motion"] + self.phases["timers"]
+                world.advance(self.now)
+                self.ticks += 1
+                self.phases["tick other"] += (time.perf_counter() - phase_started
+                                              - (self.phases["motion"] + self.phases["timers"] - inner))
+                continue
+            if kind == CHECK:
+                if state_checksum(world) != values[0]:
+                    raise TraceDiverged(f"tick {self.ticks} at {self.now} ms: spirit state differs "
+                                        f"from the recording")
+                phase = "verify"
+            elif kind in (PRESS, DRAG, RELEASE):
+                slot, x, y = values
+                spirit = world.spirits[slot]
+                {PRESS: spirit.press, DRAG: spirit.drag_to, RELEASE: spirit.release}[kind](x, y)
+                self.inputs += 1
+                phase = "input"
+            elif kind == SPAWN:
+                spirit = SpiritModel(world, values["width"], values["height"], values["frame_counts"])
+                spirit.start(values["state"])
+                phase = "setup"
+            elif kind == SCATTER:
+                world.spirits[values[0]].scatter()
+                phase = "setup"
+            elif kind == REMOVE:
+                world.unregister(world.spirits[values[0]])
+                phase = "setup"
+            elif kind == FRAMES:
+                world.spirits[values["slot"]].set_frames(values["frame_counts"], values["width"], values["height"])
+                phase = "setup"
+            elif kind == SCREENS:
+                world.screens.update(**values)
+                phase = "setup"
+            else:
+                raise TraceDiverged(f"tick {self.ticks} at {self.now} ms: unexpected "
+                                    f"{KIND_NAMES[kind]} record outside a tick")
+            self.phases[phase] += time.perf_counter() - phase_started
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        print(f"[INFO] Replayed {self.path}: {self.ticks} ticks, {self.inputs} mouse events, "
+              f"{len(self.world.spirits)} spirit(s), {self.world.transitions} transitions, "
+              f"{self.now / 1000:.0f} virtual s in {elapsed:.2f} s "
+              f"({self.now / 1000 / elapsed if elapsed else 0:.0f}x real time), state identical")
+        if self.truncated:
+            print(f"[INFO] The trace was cut off mid-record (crashed or killed session); "
+                  f"the last {self.truncated} byte(s) were ignored")
+        for phase, seconds in self.phases.items():
+            print(f"[INFO]   {phase:<10} {seconds * 1000:9.1f} ms")
+
+
+def record_synthetic(path, count, seconds, seed=0, tick_ms=TICK_MS, width=1920, height=1080):
+    """ Headless session with a wandering cursor and random clicks and drags, recorded to path """
+    screens = ScreenLayout()
+    screens.update([(0, 0, width - 1, height - 1)], [(0, 0, width - 1, height - 41)])
+    world = SpiritWorld(screens, tick_ms=tick_ms)
+    # The synthetic user has its own RNG, so the world's draws match on replay
+    user = random.Random(seed ^ 0x5EED)
+    cursor = [width // 2, height // 2]
+    world.cursor = lambda: tuple(cursor)
+    recorder = TraceRecorder(world, path, seed=seed)
+    frame_counts = {state: frame_count for state, (_, frame_count) in ANIMATIONS.items()}
+
+    for index in range(count):
+        spirit = SpiritModel(world, 32, 32, frame_counts)
+        spirit.start("walk")
+        if index:
+            spirit.scatter()
+
+    dragged = None
+    while world.now < seconds * 1000:
+        cursor[0] = min(max(cursor[0] + user.randint(-40, 40), 0), width - 1)
+        cursor[1] = min(max(cursor[1] + user.randint(-40, 40), 0), height - 1)
+        if dragged is not None:
+            if dragged not in world.members:
+                dragged = None
+            elif user.random() < 0.1:
+                dragged.release(*cursor)
+                dragged = None
+            else:
+                dragged.drag_to(*cursor)
+        elif user.random() < 0.02:
+            # Grab a spirit mid-walk, mid-climb or mid-fall: a click, or a drag to somewhere else
+            spirit = user.choice(world.spirits)
+            cursor[:] = (int(world.pos[spirit.slot, 0]) + 16, int(world.pos[spirit.slot, 1]) + 16)
+            spirit.press(*cursor)
+            if user.random() < 0.5:
+                spirit.release(*cursor)
+            else:
+                dragged = spirit
+        world.advance(world.now + tick_ms)
+    if dragged is not None:
+        dragged.release(*cursor)
+    recorder.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay Desktop Spirit input traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="record a headless session with synthetic mouse input")
+    record.add_argument("path")
+    record.add_argument("--spirits", type=int, default=20, help="number of simulated spirits")
+    record.add_argument("--seconds", type=float, default=120, help="virtual seconds to record")
+    record.add_argument("--seed", type=int, default=0, help="RNG seed for the world and the synthetic input")
+    record.add_argument("--tick-rate", type=tick_rate, default=1000 / TICK_MS, help="simulation ticks per second")
+    replay = commands.add_parser("replay", help="replay a trace, check every tick and time each phase")
+    replay.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_synthetic(args.path, args.spirits, args.seconds, args.seed, tick_ms=tick_ms_for(args.tick_rate))
+        sys.exit(0)
+
+    try:
+        replayer = TraceReplayer(args.path)
+        elapsed = replayer.run()
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[ERROR] Failed to read trace '{args.path}': {e}")
+        sys.exit(2)
+    except TraceDiverged as e:
+        print(f"[ERROR] Replay diverged at {e}")
+        sys.exit(1)
+    replayer.report(elapsed)